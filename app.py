@@ -5,8 +5,10 @@ import matplotlib.pyplot as plt
 import pandas as pd
 
 from io_json import load_problem_from_json_bytes
-from heuristics import greedy_solution, simulated_annealing
-from exact import exact_optimum
+from heuristics import greedy_solution, simulated_annealing, tabu_search
+from exact import exact_optimum, exact_dp, exact_branch_and_bound
+from local_search import local_search
+from result_cache import ResultCache, cached_solve
 from graph_viz import show_dag
 
 
@@ -26,19 +28,42 @@ Carica un file JSON con:
 uploaded = st.file_uploader("Carica file JSON", type=["json"])
 
 # -----------------------------
-# Sidebar: parametri SA
+# Sidebar: metaeuristica (SA o tabu search)
 # -----------------------------
-st.sidebar.header("Simulated Annealing")
-T_start = st.sidebar.slider("T_start", 0.1, 100.0, 1.0)
-T_end = st.sidebar.slider("T_end", 1e-4, 0.1, 0.001)
-alpha = st.sidebar.slider("alpha", 0.90, 0.999, 0.98)
-iters_per_T = st.sidebar.slider("iters_per_T", 50, 500, 200)
-max_steps = st.sidebar.slider("max_steps", 500, 50000, 15000)
+st.sidebar.header("Metaeuristica")
+meta = st.sidebar.selectbox("Algoritmo", ["Simulated Annealing", "Tabu search"])
+if meta == "Simulated Annealing":
+    T_start = st.sidebar.slider("T_start", 0.1, 100.0, 1.0)
+    T_end = st.sidebar.slider("T_end", 1e-4, 0.1, 0.001)
+    alpha = st.sidebar.slider("alpha", 0.90, 0.999, 0.98)
+    iters_per_T = st.sidebar.slider("iters_per_T", 50, 500, 200)
+    max_steps = st.sidebar.slider("max_steps", 500, 50000, 15000)
+    sa_move = st.sidebar.selectbox("Mossa", ["swap", "insert", "mixed"])
+else:
+    ts_iters = st.sidebar.slider("Iterazioni", 50, 2000, 500)
+    ts_tenure = st.sidebar.slider("Tenure (0 = automatica)", 0, 30, 0)
+
+# Ricerca locale
+st.sidebar.header("Ricerca locale")
+ls_strategy = st.sidebar.selectbox(
+    "Dopo greedy e SA", ["nessuna", "first", "best"],
+    format_func=lambda m: {"nessuna": "Nessuna", "first": "First improvement",
+                           "best": "Best improvement"}[m],
+)
 
 # Ottimo esatto
 st.sidebar.header("Ottimo esatto")
 do_exact = st.sidebar.checkbox("Calcola ottimo (solo grafi piccoli)", value=True)
-exact_limit = st.sidebar.slider("Limite nodi per ottimo", 5, 15, 12)
+exact_solver = st.sidebar.selectbox(
+    "Solver esatto", ["dp", "enum"],
+    format_func=lambda m: "DP sui downset" if m == "dp" else "Enumerazione topological sorts",
+)
+if exact_solver == "dp":
+    exact_limit = st.sidebar.slider("Limite nodi per ottimo", 5, 22, 20)
+else:
+    exact_limit = st.sidebar.slider("Limite nodi per ottimo", 5, 15, 12)
+use_cache = st.sidebar.checkbox("Usa cache dei risultati", value=True,
+                                help="Riusa l'ottimo già calcolato per lo stesso grafo")
 
 run = st.button("▶ Esegui")
 
@@ -59,7 +84,7 @@ if run:
 
     st.write(
         f"**Nodi:** {len(problem.nodes)} | "
-        f"**Archi:** {problem.G.number_of_edges()}"
+        f"**Archi:** {len(problem.compiled.edges)}"
     )
 
     # 2) DAG
@@ -72,36 +97,81 @@ if run:
     st.write("**Ordine Greedy:**", format_order_inline(greedy_order))
     st.write(f"**Costo Greedy:** {greedy_cost:.4f}")
 
-    # 4) SA
-    st.subheader("Simulated Annealing")
-    sa_order, sa_cost, history = simulated_annealing(
-        problem,
-        T_start=T_start,
-        T_end=T_end,
-        alpha=alpha,
-        iters_per_T=iters_per_T,
-        max_steps=max_steps,
-        seed=42
-    )
-    st.write("**Ordine SA:**", format_order_inline(sa_order))
-    st.write(f"**Costo SA:** {sa_cost:.4f}")
+    # 4) Metaeuristica: SA o tabu search (stessa terna order, cost, history)
+    st.subheader(meta)
+    if meta == "Simulated Annealing":
+        sa_order, sa_cost, history = simulated_annealing(
+            problem,
+            T_start=T_start,
+            T_end=T_end,
+            alpha=alpha,
+            iters_per_T=iters_per_T,
+            max_steps=max_steps,
+            seed=42,
+            move=sa_move,
+        )
+        st.caption(" | ".join(
+            f"{kind}: {ms['rejected_rate']:.1%} proposte rifiutate"
+            for kind, ms in history.move_stats.items()
+        ))
+    else:
+        sa_order, sa_cost, history = tabu_search(
+            problem,
+            max_iters=ts_iters,
+            tenure=(ts_tenure or None),
+            seed=42,
+            record_every_step=True,
+        )
+        st.caption(f"Arresto: {history.stop_reason}")
+    st.write(f"**Ordine {meta}:**", format_order_inline(sa_order))
+    st.write(f"**Costo {meta}:** {sa_cost:.4f}")
+
+    # 4b) Ricerca locale (opzionale)
+    ls_rows = []
+    if ls_strategy != "nessuna":
+        st.subheader("Ricerca locale")
+        for name, order in (("Greedy", greedy_order), (meta, sa_order)):
+            ls_order, ls_cost, ls_stats = local_search(problem, order, strategy=ls_strategy)
+            st.write(f"**{name} + ricerca locale:** {ls_cost:.4f} "
+                     f"({sum(ls_stats['moves'].values())} mosse)")
+            ls_rows.append({"Algoritmo": f"{name} + ricerca locale", "Costo": ls_cost,
+                            "Ordine": format_order_inline(ls_order)})
 
     # 5) Ottimo esatto (opzionale)
     opt_order, opt_cost = None, None
     if do_exact and len(problem.nodes) <= exact_limit:
         st.subheader("Ottimo esatto")
-        opt_order, opt_cost = exact_optimum(problem)
+        results = ResultCache() if use_cache else None
+        if exact_solver == "dp":
+            try:
+                opt_order, opt_cost, opt_stats, opt_time, hit = cached_solve(
+                    results, problem, "exact_dp", {},
+                    lambda: exact_dp(problem))
+                st.caption(f"Downset visitati: {opt_stats['states']}")
+            except ValueError as e:
+                st.warning(f"DP interrotta ({e}): ottimo col branch-and-bound.")
+                opt_order, opt_cost, _, opt_time, hit = cached_solve(
+                    results, problem, "exact_branch_and_bound", {"incumbent": "greedy"},
+                    lambda: exact_branch_and_bound(problem, incumbent="greedy"))
+        else:
+            opt_order, opt_cost, _, opt_time, hit = cached_solve(
+                results, problem, "exact_optimum", {},
+                lambda: exact_optimum(problem) + ({},))
+        if results is not None:
+            results.close()
+        if hit:
+            st.caption(f"Dalla cache (calcolato in {opt_time:.3f}s)")
         st.write("**Ordine ottimo:**", format_order_inline(opt_order))
         st.write(f"**Costo ottimo:** {opt_cost:.4f}")
     elif do_exact:
         st.info(f"Ottimo saltato: troppi nodi (>{exact_limit}).")
 
     # 6) Plot convergenza SA
-    st.subheader("Convergenza SA")
+    st.subheader(f"Convergenza {meta}")
 
-    steps = [h["step"] for h in history]
-    curr = [h["current_cost"] for h in history]
-    best = [h["best_cost"] for h in history]
+    steps = history.step
+    curr = history.current_cost
+    best = history.best_cost
 
     fig, ax = plt.subplots()
     ax.plot(steps, curr, label="current")
@@ -122,8 +192,8 @@ if run:
 
     rows = [
         {"Algoritmo": "Greedy", "Costo": greedy_cost, "Ordine": format_order_inline(greedy_order)},
-        {"Algoritmo": "Simulated Annealing", "Costo": sa_cost, "Ordine": format_order_inline(sa_order)},
-    ]
+        {"Algoritmo": meta, "Costo": sa_cost, "Ordine": format_order_inline(sa_order)},
+    ] + ls_rows
     if opt_cost is not None:
         rows.append({"Algoritmo": "Ottimo", "Costo": opt_cost, "Ordine": format_order_inline(opt_order)})
 
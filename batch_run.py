@@ -1,16 +1,26 @@
 # batch_run.py
 # Script per eseguire un batch di test su tutti i file JSON in una cartella.
 #es run: >python batch_run.py --folder testN10 --out risultati_N10.xlsx
+#in parallelo: >python batch_run.py --folder testN20 --out risultati_N20.xlsx --workers 4
+#istanze binarie (vedi io_binary.py): >python batch_run.py --folder testN20_bin --ext .stpb
+#ripresa dopo un'interruzione: stessa riga di comando + --resume
 import os
 import glob
+import json
 import time
-import math
+import hashlib
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 
 from io_json import load_problem_from_json_bytes
-from heuristics import greedy_solution, simulated_annealing
-from exact import exact_optimum
+from io_binary import EXT as BIN_EXT, load_problem_binary
+from heuristics import greedy_solution, simulated_annealing, tabu_search
+from sidney import sidney_solution
+from local_search import local_search
+from exact import exact_optimum, exact_dp, exact_branch_and_bound
+from calibration import calibrate
+from result_cache import ResultCache, cached_solve, DEFAULT_PATH as CACHE_PATH
 
 
 def load_problem_from_json_file(path):
@@ -19,41 +29,434 @@ def load_problem_from_json_file(path):
     return load_problem_from_json_bytes(content)
 
 
-def estimate_T_start(problem, samples=1000, repeats=3, p0=0.8, seed=42):
-    """
-    Stima T_start dal grafo usando la mediana dei delta peggiorativi (delta>0)
-    e formula T_start = -d / ln(p0).
-    Ritorna (T_start, d_typ) oppure (None, None) se non stimabile.
-    """
-    import random
-    rng = random.Random(seed)
+def load_problem_file(path):
+    """JSON oppure formato binario (.stpb), in base all'estensione."""
+    if path.endswith(BIN_EXT):
+        return load_problem_binary(path)
+    return load_problem_from_json_file(path)
+
+
+# parametri che non cambiano i risultati: esclusi dalla chiave del journal
+_JOURNAL_IGNORED = ("exact_workers", "calib_cache", "cache")
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
-    order = problem.random_topological_order()
-    base_cost = problem.expected_cost(order)
-    n = len(order)
 
-    deltas_pos = []
+def params_key(params):
+    """Impronta dei parametri del batch (JSON canonico, senza _JOURNAL_IGNORED)."""
+    relevant = {k: v for k, v in params.items() if k not in _JOURNAL_IGNORED}
+    return hashlib.sha256(json.dumps(relevant, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _json_default(o):
+    # scalari NumPy (int64, bool_) nelle righe
+    if hasattr(o, "item"):
+        return o.item()
+    return str(o)
+
+
+def append_journal(f, key, pkey, row):
+    """
+    Una riga JSONL per file completato, scritta subito su disco.
+    key = (nome del file relativo alla cartella, file_hash).
+    """
+    fname, fhash = key
+    f.write(json.dumps({"file": fname, "file_hash": fhash, "params": pkey, "row": row},
+                       default=_json_default) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
 
-    for _ in range(repeats):
-        order = problem.random_topological_order()
-        base_cost = problem.expected_cost(order)
 
-        for _ in range(samples):
-            i, j = rng.sample(range(n), 2)
-            neigh = problem.try_swap(order, i, j)
-            if neigh is None:
+def read_journal(path, pkey):
+    """
+    Righe già completate con i parametri pkey: {(file, file_hash): row}.
+    La chiave include il nome del file: due file con lo stesso contenuto
+    hanno righe distinte, e un file modificato non riusa la riga vecchia.
+    Le righe troncate (interruzione durante la scrittura) sono ignorate;
+    a parità di chiave vale l'ultima.
+    """
+    done = {}
+    try:
+        f = open(path, "r", encoding="utf-8")
+    except FileNotFoundError:
+        return done
+    with f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
                 continue
-            d = problem.expected_cost(neigh) - base_cost
-            if d > 0:
-                deltas_pos.append(d)
+            if entry.get("params") == pkey and "file" in entry:
+                done[(entry["file"], entry["file_hash"])] = entry["row"]
+    return done
 
-    if not deltas_pos:
-        return None, None
 
-    deltas_pos.sort()
-    d_typ = deltas_pos[len(deltas_pos) // 2]  # mediana
-    T_start = -d_typ / math.log(p0)
-    return float(T_start), float(d_typ)
+def solve_file(
+    path,
+    do_exact=True,
+    exact_limit=12,
+    exact_solver="enum",
+    dp_limit=20,
+    dp_max_states=1_000_000,
+    exact_workers=1,
+    # branch-and-bound (colonne bnb_*)
+    do_bnb=False,
+    bnb_limit=20,
+    bnb_incumbent="greedy",
+    # SA params (usati se non auto_T)
+    T_start=50.0,
+    T_end=1.0,
+    alpha=0.99,
+    iters_per_T=200,
+    max_steps=15000,
+    seed=42,
+    sa_init="random",
+    sa_time_budget_s=None,
+    sa_patience=None,
+    sa_move="swap",
+    # ricerca locale dopo greedy c/(1-p) e SA (None = disattivata)
+    ls=None,
+    # tabu search (colonne ts_*)
+    do_tabu=False,
+    ts_iters=500,
+    ts_tenure=None,
+    # auto T_start
+    auto_T=False,
+    auto_samples=1000,
+    auto_repeats=3,
+    auto_p0=0.8,
+    auto_q=0.5,
+    auto_schedule=False,
+    calib_cache=".calib_cache",
+    # cache SQLite dei risultati esatti (None = disattivata)
+    cache=CACHE_PATH,
+):
+    """
+    Risolve un singolo file (greedy, Sidney, SA, exact opzionali) e restituisce
+    (riga_risultati, righe_di_log). Non stampa nulla: così può girare in un
+    processo worker e il log viene stampato dal processo principale.
+    """
+    fname = os.path.basename(path)
+    t_file = time.perf_counter()
+    lines = [f"\n=== {fname} ==="]
+    log = lines.append
+
+    # 1) load
+    try:
+        problem = load_problem_file(path)
+    except Exception as e:
+        log(f"  ERRORE caricamento: {e}")
+        return {
+            "file": fname,
+            "status": "error",
+            "error": str(e),
+            "wall_time_s": time.perf_counter() - t_file,
+            "worker_pid": os.getpid(),
+        }, lines
+
+    cp = problem.compiled
+    n_nodes = cp.n
+    n_edges = len(cp.edges)
+    density = None
+    if n_nodes > 1:
+        density = n_edges / (n_nodes * (n_nodes - 1) / 2)
+
+    # stats cost/p
+    costs = cp.cost
+    ps = cp.p
+    avg_cost = sum(costs) / len(costs) if costs else None
+    avg_p = sum(ps) / len(ps) if ps else None
+    min_p = min(ps) if ps else None
+    max_p = max(ps) if ps else None
+
+    # 2) Greedy c/p
+    t0 = time.perf_counter()
+    g1_order, g1_cost = greedy_solution(problem, mode="c_over_p")
+    g1_time = time.perf_counter() - t0
+    log(f"  Greedy c/p      cost={g1_cost:.4f}  time={g1_time:.3f}s")
+
+    # 3) Greedy c/(1-p)
+    t0 = time.perf_counter()
+    g2_order, g2_cost = greedy_solution(problem, mode="c_over_fail")
+    g2_time = time.perf_counter() - t0
+    log(f"  Greedy c/(1-p)  cost={g2_cost:.4f}  time={g2_time:.3f}s")
+
+    # 3b) Sidney / serie-parallelo (esatto se il DAG è serie-parallelo)
+    t0 = time.perf_counter()
+    sp_order, sp_cost, sp_info = sidney_solution(problem)
+    sp_time = time.perf_counter() - t0
+    log(f"  Sidney          cost={sp_cost:.4f}  time={sp_time:.3f}s  "
+          f"serie-parallelo={sp_info['series_parallel']}")
+
+    # 4) SA params (T_start per-grafo se auto_T; anche T_end e iters_per_T
+    #    se auto_schedule). La calibrazione è in cache per contenuto dell'istanza.
+    T_start_used = T_start
+    T_end_used = T_end
+    iters_per_T_used = iters_per_T
+    d_typ = None
+    calib_time = None
+    if auto_T:
+        t0 = time.perf_counter()
+        T_est, d_est, T_end_est, iters_est = calibrate(
+            problem,
+            samples=auto_samples,
+            repeats=auto_repeats,
+            p0=auto_p0,
+            q=auto_q,
+            seed=seed,
+            cache_dir=calib_cache,
+        )
+        calib_time = time.perf_counter() - t0
+        if T_est is not None:
+            T_start_used = T_est
+            d_typ = d_est
+            if auto_schedule:
+                T_end_used = T_end_est
+                iters_per_T_used = iters_est
+
+    # 5) Simulated Annealing
+    t0 = time.perf_counter()
+    sa_order, sa_cost, history = simulated_annealing(
+        problem,
+        T_start=T_start_used,
+        T_end=T_end_used,
+        alpha=alpha,
+        iters_per_T=iters_per_T_used,
+        max_steps=max_steps,
+        seed=seed,
+        record_every_step=False,  # history compatta: iniziale + miglioramenti best
+        init_order=(sp_order if sa_init == "sidney" else None),
+        time_budget_s=sa_time_budget_s,
+        patience=sa_patience,
+        move=sa_move,
+    )
+    sa_time = time.perf_counter() - t0
+    log(f"  SA              cost={sa_cost:.4f}  time={sa_time:.3f}s  "
+        f"stop={history.stop_reason}")
+
+    # tempo in cui trovi il best finale (se heuristics.py è aggiornato con t_s)
+    sa_step_to_final_best = None
+    sa_time_to_final_best_s = None
+    sa_time_to_final_best_frac = None
+    sa_best_updates = None
+
+    if history and isinstance(history[-1], dict):
+        sa_best_updates = len(history) - 1
+        sa_step_to_final_best = history[-1].get("step")
+        sa_time_to_final_best_s = history[-1].get("t_s")
+        if sa_time_to_final_best_s is not None and sa_time > 0:
+            sa_time_to_final_best_frac = sa_time_to_final_best_s / sa_time
+
+    # 5b) Ricerca locale (opzionale) come post-processing di greedy c/(1-p) e SA
+    g2_ls_cost, sa_ls_cost, ls_time, ls_moves = None, None, None, None
+    if ls:
+        t0 = time.perf_counter()
+        _, g2_ls_cost, g2_ls_stats = local_search(problem, g2_order, strategy=ls)
+        _, sa_ls_cost, sa_ls_stats = local_search(problem, sa_order, strategy=ls)
+        ls_time = time.perf_counter() - t0
+        ls_moves = sum(g2_ls_stats["moves"].values()) + sum(sa_ls_stats["moves"].values())
+        log(f"  LS ({ls})        greedy c/(1-p)={g2_ls_cost:.4f}  SA={sa_ls_cost:.4f}  "
+            f"time={ls_time:.3f}s")
+
+    # 5c) Tabu search (opzionale)
+    ts_cost, ts_time, ts_order, ts_history = None, None, None, None
+    if do_tabu:
+        t0 = time.perf_counter()
+        ts_order, ts_cost, ts_history = tabu_search(
+            problem, max_iters=ts_iters, tenure=ts_tenure, seed=seed,
+            init_order=(sp_order if sa_init == "sidney" else None),
+        )
+        ts_time = time.perf_counter() - t0
+        log(f"  Tabu            cost={ts_cost:.4f}  time={ts_time:.3f}s  "
+            f"stop={ts_history.stop_reason}")
+
+    # gap vs greedy
+    gap_sa_vs_g1 = (sa_cost - g1_cost) / g1_cost if g1_cost and g1_cost > 0 else None
+    gap_sa_vs_g2 = (sa_cost - g2_cost) / g2_cost if g2_cost and g2_cost > 0 else None
+
+    # 6) Exact (opzionale). Con la cache i risultati esatti si riusano tra
+    #    run con parametri diversi: la chiave dipende solo da istanza (con
+    #    l'ordine di nodi e archi), solver e versione (result_cache.py).
+    results = ResultCache(cache) if cache else None
+    opt_cost, opt_time, opt_states, opt_cached, opt_solver = None, None, None, None, None
+    gap_g1_vs_opt, gap_g2_vs_opt, gap_sa_vs_opt = None, None, None
+    gap_sa_ls_vs_opt, gap_ts_vs_opt = None, None
+
+    # exact_limit vale per l'enumerazione; la DP sui downset ha un suo limite
+    node_limit = dp_limit if exact_solver == "dp" else exact_limit
+    if do_exact and n_nodes <= node_limit:
+        opt_solver = exact_solver
+        if exact_solver == "dp":
+            try:
+                opt_order, opt_cost, opt_stats, opt_time, opt_cached = cached_solve(
+                    results, problem, "exact_dp", {},
+                    lambda: exact_dp(problem, max_states=dp_max_states))
+                opt_states = opt_stats["states"]
+            except ValueError as e:
+                # troppi downset (DAG con pochi archi): ottimo col branch-and-bound
+                log(f"  DP interrotta ({e}) -> branch-and-bound")
+                opt_solver = "bnb_fallback"
+                bnb_params = {"incumbent": bnb_incumbent}
+                if bnb_incumbent == "sa":
+                    bnb_params["seed"] = seed
+                opt_order, opt_cost, _, opt_time, opt_cached = cached_solve(
+                    results, problem, "exact_branch_and_bound", bnb_params,
+                    lambda: exact_branch_and_bound(problem, incumbent=bnb_incumbent, seed=seed))
+        else:
+            opt_order, opt_cost, _, opt_time, opt_cached = cached_solve(
+                results, problem, "exact_optimum", {},
+                lambda: exact_optimum(problem, workers=exact_workers) + ({},))
+        log(f"  OPT             cost={opt_cost:.4f}  time={opt_time:.3f}s"
+            + ("  (cache)" if opt_cached else ""))
+
+        if opt_cost and opt_cost > 0:
+            gap_g1_vs_opt = (g1_cost - opt_cost) / opt_cost
+            gap_g2_vs_opt = (g2_cost - opt_cost) / opt_cost
+            gap_sa_vs_opt = (sa_cost - opt_cost) / opt_cost
+            if sa_ls_cost is not None:
+                gap_sa_ls_vs_opt = (sa_ls_cost - opt_cost) / opt_cost
+            if ts_cost is not None:
+                gap_ts_vs_opt = (ts_cost - opt_cost) / opt_cost
+    else:
+        if do_exact:
+            log(f"  OPT saltato (n_nodes={n_nodes} > {node_limit})")
+        opt_order = None
+
+    # 6b) Branch-and-bound (opzionale)
+    bnb_cost, bnb_time, bnb_stats, bnb_order, bnb_cached = None, None, {}, None, None
+    if do_bnb and n_nodes <= bnb_limit:
+        # le stats dipendono dall'incumbent (e dal seed solo se l'incumbent è la SA)
+        bnb_params = {"incumbent": bnb_incumbent}
+        if bnb_incumbent == "sa":
+            bnb_params["seed"] = seed
+        bnb_order, bnb_cost, bnb_stats, bnb_time, bnb_cached = cached_solve(
+            results, problem, "exact_branch_and_bound", bnb_params,
+            lambda: exact_branch_and_bound(problem, incumbent=bnb_incumbent, seed=seed))
+        log(f"  B&B             cost={bnb_cost:.4f}  time={bnb_time:.3f}s  "
+              f"nodi={bnb_stats['nodes_explored']}  potati={bnb_stats['nodes_pruned']}"
+              + ("  (cache)" if bnb_cached else ""))
+    elif do_bnb:
+        log(f"  B&B saltato (n_nodes={n_nodes} > {bnb_limit})")
+    if results is not None:
+        results.close()
+
+    # 7) riga risultati
+    row = {
+        "file": fname,
+        "status": "ok",
+        "error": "",
+
+        "n_nodes": n_nodes,
+        "n_edges": n_edges,
+        "density_undirected_like": density,
+        "avg_cost": avg_cost,
+        "avg_p": avg_p,
+        "min_p": min_p,
+        "max_p": max_p,
+
+        # greedy
+        "g1_mode": "c_over_p",
+        "g1_cost": g1_cost,
+        "g1_time_s": g1_time,
+        "g1_order": " -> ".join(map(str, g1_order)),
+
+        "g2_mode": "c_over_fail",
+        "g2_cost": g2_cost,
+        "g2_time_s": g2_time,
+        "g2_order": " -> ".join(map(str, g2_order)),
+
+        # Sidney / serie-parallelo
+        "sp_cost": sp_cost,
+        "sp_time_s": sp_time,
+        "sp_series_parallel": sp_info["series_parallel"],
+        "sp_prime_modules": sp_info["prime_modules"],
+        "sp_order": " -> ".join(map(str, sp_order)),
+
+        # SA params used
+        "sa_T_start_used": T_start_used,
+        "sa_T_end": T_end_used,
+        "sa_alpha": alpha,
+        "sa_iters_per_T": iters_per_T_used,
+        "sa_max_steps": max_steps,
+        "sa_seed": seed,
+        "sa_init": sa_init,
+        "sa_time_budget_s": sa_time_budget_s,
+        "sa_patience": sa_patience,
+        "sa_move": sa_move,
+        "sa_auto_T": auto_T,
+        "sa_auto_p0": auto_p0,
+        "sa_auto_samples": auto_samples if auto_T else None,
+        "sa_auto_repeats": auto_repeats if auto_T else None,
+        "sa_auto_q": auto_q if auto_T else None,
+        "sa_auto_schedule": auto_schedule if auto_T else None,
+        "sa_d_typ": d_typ,
+        "sa_calib_time_s": calib_time,
+
+        # SA results
+        "sa_cost": sa_cost,
+        "sa_time_s": sa_time,
+        "sa_order": " -> ".join(map(str, sa_order)),
+
+        "sa_best_updates": sa_best_updates,
+        "sa_step_to_final_best": sa_step_to_final_best,
+        "sa_time_to_final_best_s": sa_time_to_final_best_s,
+        "sa_time_to_final_best_frac": sa_time_to_final_best_frac,
+        "sa_stop_reason": history.stop_reason,
+
+        # ricerca locale
+        "ls": ls,
+        "g2_ls_cost": g2_ls_cost,
+        "sa_ls_cost": sa_ls_cost,
+        "ls_time_s": ls_time,
+        "ls_moves": ls_moves,
+
+        # tabu search
+        "ts_cost": ts_cost,
+        "ts_time_s": ts_time,
+        "ts_iters": ts_iters if do_tabu else None,
+        "ts_stop_reason": ts_history.stop_reason if do_tabu else None,
+        "ts_step_to_final_best": ts_history[-1]["step"] if do_tabu else None,
+        "ts_time_to_final_best_s": ts_history[-1]["t_s"] if do_tabu else None,
+        "ts_order": (" -> ".join(map(str, ts_order)) if ts_order else None),
+        "sa_swap_rejected_rate": history.move_stats.get("swap", {}).get("rejected_rate"),
+        "sa_insert_rejected_rate": history.move_stats.get("insert", {}).get("rejected_rate"),
+
+        "gap_sa_vs_g1": gap_sa_vs_g1,
+        "gap_sa_vs_g2": gap_sa_vs_g2,
+
+        # exact
+        "opt_cost": opt_cost,
+        "opt_time_s": opt_time,
+        "opt_solver": opt_solver,
+        "opt_states": opt_states,
+        "opt_cached": opt_cached,
+        "opt_order": (" -> ".join(map(str, opt_order)) if opt_order else None),
+
+        # branch-and-bound
+        "bnb_cost": bnb_cost,
+        "bnb_time_s": bnb_time,
+        "bnb_incumbent": bnb_incumbent if do_bnb else None,
+        "bnb_incumbent_cost": bnb_stats.get("incumbent_cost"),
+        "bnb_nodes_explored": bnb_stats.get("nodes_explored"),
+        "bnb_nodes_pruned": bnb_stats.get("nodes_pruned"),
+        "bnb_nodes_dominated": bnb_stats.get("nodes_dominated"),
+        "bnb_t_best_s": bnb_stats.get("t_best_s"),
+        "bnb_t_proved_s": bnb_stats.get("t_proved_s"),
+        "bnb_cached": bnb_cached,
+        "bnb_order": (" -> ".join(map(str, bnb_order)) if bnb_order else None),
+
+        "gap_g1_vs_opt": gap_g1_vs_opt,
+        "gap_g2_vs_opt": gap_g2_vs_opt,
+        "gap_sa_vs_opt": gap_sa_vs_opt,
+        "gap_sa_ls_vs_opt": gap_sa_ls_vs_opt,
+        "gap_ts_vs_opt": gap_ts_vs_opt,
+    }
+    row["wall_time_s"] = time.perf_counter() - t_file
+    row["worker_pid"] = os.getpid()
+    return row, lines
 
 
 def run_batch(
@@ -62,6 +465,14 @@ def run_batch(
     out_csv=None,
     do_exact=True,
     exact_limit=12,
+    exact_solver="enum",
+    dp_limit=20,
+    dp_max_states=1_000_000,
+    exact_workers=1,
+    # branch-and-bound (colonne bnb_*)
+    do_bnb=False,
+    bnb_limit=20,
+    bnb_incumbent="greedy",
     # SA params (usati se non auto_T)
     T_start=50.0,
     T_end=1.0,
@@ -69,16 +480,37 @@ def run_batch(
     iters_per_T=200,
     max_steps=15000,
     seed=42,
+    sa_init="random",
+    sa_time_budget_s=None,
+    sa_patience=None,
+    sa_move="swap",
+    # ricerca locale dopo greedy c/(1-p) e SA (None = disattivata)
+    ls=None,
+    # tabu search (colonne ts_*)
+    do_tabu=False,
+    ts_iters=500,
+    ts_tenure=None,
     # auto T_start
     auto_T=False,
     auto_samples=1000,
     auto_repeats=3,
     auto_p0=0.8,
+    auto_q=0.5,
+    auto_schedule=False,
+    calib_cache=".calib_cache",
+    cache=CACHE_PATH,
+    # parallelismo tra file
+    workers=1,
+    # journal JSONL delle righe completate (default: out_excel con .jsonl)
+    journal=None,
+    resume=False,
+    # estensione delle istanze: ".json" oppure ".stpb" (io_binary.py)
+    ext=".json",
 ):
-    pattern = os.path.join(folder, "*.json")
+    pattern = os.path.join(folder, "*" + ext)
     files = sorted(glob.glob(pattern))
     if not files:
-        print(f"[Batch] Nessun file .json trovato in: {folder}")
+        print(f"[Batch] Nessun file {ext} trovato in: {folder}")
         return
 
     # crea directory output se serve
@@ -90,179 +522,87 @@ def run_batch(
         if out_dir2:
             os.makedirs(out_dir2, exist_ok=True)
 
-    results = []
-    print(f"[Batch] Trovati {len(files)} file JSON in '{folder}'")
-
-    for path in files:
-        fname = os.path.basename(path)
-        print(f"\n=== {fname} ===")
-
-        # 1) load
-        try:
-            problem = load_problem_from_json_file(path)
-        except Exception as e:
-            print(f"  ERRORE caricamento: {e}")
-            results.append({
-                "file": fname,
-                "status": "error",
-                "error": str(e),
-            })
-            continue
-
-        n_nodes = len(problem.nodes)
-        n_edges = problem.G.number_of_edges()
-        density = None
-        if n_nodes > 1:
-            density = n_edges / (n_nodes * (n_nodes - 1) / 2)
-
-        # stats cost/p
-        costs = [problem.test_data[u].cost for u in problem.G.nodes()]
-        ps = [problem.test_data[u].p_success for u in problem.G.nodes()]
-        avg_cost = sum(costs) / len(costs) if costs else None
-        avg_p = sum(ps) / len(ps) if ps else None
-        min_p = min(ps) if ps else None
-        max_p = max(ps) if ps else None
-
-        # 2) Greedy c/p
-        t0 = time.perf_counter()
-        g1_order, g1_cost = greedy_solution(problem, mode="c_over_p")
-        g1_time = time.perf_counter() - t0
-        print(f"  Greedy c/p      cost={g1_cost:.4f}  time={g1_time:.3f}s")
+    params = dict(
+        do_exact=do_exact,
+        exact_limit=exact_limit,
+        exact_solver=exact_solver,
+        dp_limit=dp_limit,
+        dp_max_states=dp_max_states,
+        exact_workers=exact_workers,
+        do_bnb=do_bnb,
+        bnb_limit=bnb_limit,
+        bnb_incumbent=bnb_incumbent,
+        T_start=T_start,
+        T_end=T_end,
+        alpha=alpha,
+        iters_per_T=iters_per_T,
+        max_steps=max_steps,
+        seed=seed,
+        sa_init=sa_init,
+        sa_time_budget_s=sa_time_budget_s,
+        sa_patience=sa_patience,
+        sa_move=sa_move,
+        ls=ls,
+        do_tabu=do_tabu,
+        ts_iters=ts_iters,
+        ts_tenure=ts_tenure,
+        auto_T=auto_T,
+        auto_samples=auto_samples,
+        auto_repeats=auto_repeats,
+        auto_p0=auto_p0,
+        auto_q=auto_q,
+        auto_schedule=auto_schedule,
+        calib_cache=calib_cache,
+        cache=cache,
+    )
 
-        # 3) Greedy c/(1-p)
-        t0 = time.perf_counter()
-        g2_order, g2_cost = greedy_solution(problem, mode="c_over_fail")
-        g2_time = time.perf_counter() - t0
-        print(f"  Greedy c/(1-p)  cost={g2_cost:.4f}  time={g2_time:.3f}s")
-
-        # 4) SA params (T_start per-grafo se auto_T)
-        T_start_used = T_start
-        d_typ = None
-        if auto_T:
-            T_est, d_est = estimate_T_start(
-                problem,
-                samples=auto_samples,
-                repeats=auto_repeats,
-                p0=auto_p0,
-                seed=seed
-            )
-            if T_est is not None:
-                T_start_used = T_est
-                d_typ = d_est
-
-        # 5) Simulated Annealing
-        t0 = time.perf_counter()
-        sa_order, sa_cost, history = simulated_annealing(
-            problem,
-            T_start=T_start_used,
-            T_end=T_end,
-            alpha=alpha,
-            iters_per_T=iters_per_T,
-            max_steps=max_steps,
-            seed=seed,
-            record_every_step=False,  # history compatta: iniziale + miglioramenti best
-        )
-        sa_time = time.perf_counter() - t0
-        print(f"  SA              cost={sa_cost:.4f}  time={sa_time:.3f}s")
-
-        # tempo in cui trovi il best finale (se heuristics.py è aggiornato con t_s)
-        sa_step_to_final_best = None
-        sa_time_to_final_best_s = None
-        sa_time_to_final_best_frac = None
-        sa_best_updates = None
-
-        if history and isinstance(history[-1], dict):
-            sa_best_updates = len(history) - 1
-            sa_step_to_final_best = history[-1].get("step")
-            sa_time_to_final_best_s = history[-1].get("t_s")
-            if sa_time_to_final_best_s is not None and sa_time > 0:
-                sa_time_to_final_best_frac = sa_time_to_final_best_s / sa_time
-
-        # gap vs greedy
-        gap_sa_vs_g1 = (sa_cost - g1_cost) / g1_cost if g1_cost and g1_cost > 0 else None
-        gap_sa_vs_g2 = (sa_cost - g2_cost) / g2_cost if g2_cost and g2_cost > 0 else None
-
-        # 6) Exact (opzionale)
-        opt_cost, opt_time = None, None
-        gap_g1_vs_opt, gap_g2_vs_opt, gap_sa_vs_opt = None, None, None
-
-        if do_exact and n_nodes <= exact_limit:
-            t0 = time.perf_counter()
-            opt_order, opt_cost = exact_optimum(problem)
-            opt_time = time.perf_counter() - t0
-            print(f"  OPT             cost={opt_cost:.4f}  time={opt_time:.3f}s")
-
-            if opt_cost and opt_cost > 0:
-                gap_g1_vs_opt = (g1_cost - opt_cost) / opt_cost
-                gap_g2_vs_opt = (g2_cost - opt_cost) / opt_cost
-                gap_sa_vs_opt = (sa_cost - opt_cost) / opt_cost
+    print(f"[Batch] Trovati {len(files)} file {ext} in '{folder}'")
+
+    # journal: ogni riga completata viene aggiunta subito, così un crash o un
+    # Ctrl-C non perde i file già risolti. Con resume si saltano i file già
+    # nel journal con lo stesso nome, lo stesso contenuto e gli stessi
+    # parametri (le righe in errore si rieseguono); senza resume il journal
+    # riparte da zero.
+    if journal is None:
+        journal = os.path.splitext(out_excel)[0] + ".jsonl"
+    pkey = params_key(params)
+    keys = [(os.path.relpath(path, folder), file_hash(path)) for path in files]
+    done_rows = read_journal(journal, pkey) if resume else {}
+
+    todo = [k for k, key in enumerate(keys)
+            if done_rows.get(key, {}).get("status") != "ok"]
+    if resume:
+        print(f"[Batch] Ripresa da '{journal}': {len(files) - len(todo)} file già fatti, "
+              f"{len(todo)} da eseguire")
+
+    with open(journal, "a" if resume else "w", encoding="utf-8") as jf:
+        if workers <= 1:
+            for k in todo:
+                row, lines = solve_file(files[k], **params)
+                print("\n".join(lines))
+                append_journal(jf, keys[k], pkey, row)
         else:
-            if do_exact:
-                print(f"  OPT saltato (n_nodes={n_nodes} > {exact_limit})")
-            opt_order = None
-
-        # 7) salva riga
-        results.append({
-            "file": fname,
-            "status": "ok",
-            "error": "",
-
-            "n_nodes": n_nodes,
-            "n_edges": n_edges,
-            "density_undirected_like": density,
-            "avg_cost": avg_cost,
-            "avg_p": avg_p,
-            "min_p": min_p,
-            "max_p": max_p,
-
-            # greedy
-            "g1_mode": "c_over_p",
-            "g1_cost": g1_cost,
-            "g1_time_s": g1_time,
-            "g1_order": " -> ".join(map(str, g1_order)),
-
-            "g2_mode": "c_over_fail",
-            "g2_cost": g2_cost,
-            "g2_time_s": g2_time,
-            "g2_order": " -> ".join(map(str, g2_order)),
-
-            # SA params used
-            "sa_T_start_used": T_start_used,
-            "sa_T_end": T_end,
-            "sa_alpha": alpha,
-            "sa_iters_per_T": iters_per_T,
-            "sa_max_steps": max_steps,
-            "sa_seed": seed,
-            "sa_auto_T": auto_T,
-            "sa_auto_p0": auto_p0,
-            "sa_auto_samples": auto_samples if auto_T else None,
-            "sa_auto_repeats": auto_repeats if auto_T else None,
-            "sa_d_typ": d_typ,
-
-            # SA results
-            "sa_cost": sa_cost,
-            "sa_time_s": sa_time,
-            "sa_order": " -> ".join(map(str, sa_order)),
-
-            "sa_best_updates": sa_best_updates,
-            "sa_step_to_final_best": sa_step_to_final_best,
-            "sa_time_to_final_best_s": sa_time_to_final_best_s,
-            "sa_time_to_final_best_frac": sa_time_to_final_best_frac,
-
-            "gap_sa_vs_g1": gap_sa_vs_g1,
-            "gap_sa_vs_g2": gap_sa_vs_g2,
-
-            # exact
-            "opt_cost": opt_cost,
-            "opt_time_s": opt_time,
-            "opt_order": (" -> ".join(map(str, opt_order)) if opt_order else None),
-
-            "gap_g1_vs_opt": gap_g1_vs_opt,
-            "gap_g2_vs_opt": gap_g2_vs_opt,
-            "gap_sa_vs_opt": gap_sa_vs_opt,
-        })
-
-    df = pd.DataFrame(results)
+            if exact_workers > 1:
+                print("[Batch] --exact_workers ignorato con --workers > 1")
+                params["exact_workers"] = 1
+            done = 0
+            with ProcessPoolExecutor(max_workers=workers) as ex:
+                futures = {ex.submit(solve_file, files[k], **params): k for k in todo}
+                for fut in as_completed(futures):
+                    k = futures[fut]
+                    row, lines = fut.result()
+                    append_journal(jf, keys[k], pkey, row)
+                    done += 1
+                    print("\n".join(lines))
+                    print(f"  [{done}/{len(todo)}] worker pid={row['worker_pid']}  "
+                          f"wall={row['wall_time_s']:.3f}s")
+    print(f"[Batch] Journal: {journal}")
+
+    # Excel/CSV generati dal journal, nell'ordine seriale dei file (per nome)
+    # anche con più worker o dopo una ripresa
+    rows = read_journal(journal, pkey)
+    df = pd.DataFrame([dict(rows[key], file=os.path.basename(path))
+                       for path, key in zip(files, keys)])
     df.to_excel(out_excel, index=False)
     print(f"\n[Batch] Excel salvato in: {out_excel}")
 
@@ -274,11 +614,30 @@ def run_batch(
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--folder", default="test", help="Cartella con i .json (es: testN10)")
+    ap.add_argument("--ext", choices=[".json", BIN_EXT], default=".json",
+                    help=f"Formato delle istanze ({BIN_EXT}: binario, vedi io_binary.py)")
     ap.add_argument("--out", default="batch_results.xlsx", help="Output Excel (.xlsx)")
     ap.add_argument("--out_csv", default=None, help="Output CSV (opzionale)")
+    ap.add_argument("--workers", type=int, default=1, help="Processi in parallelo (un file per processo)")
+    ap.add_argument("--journal", default=None,
+                    help="Journal JSONL delle righe completate (default: --out con estensione .jsonl)")
+    ap.add_argument("--resume", action="store_true",
+                    help="Salta i file già nel journal con gli stessi parametri")
 
     ap.add_argument("--no_exact", action="store_true", help="Disabilita exact")
-    ap.add_argument("--exact_limit", type=int, default=12)
+    ap.add_argument("--exact_limit", type=int, default=12, help="Limite nodi per --exact_solver enum")
+    ap.add_argument("--exact_solver", choices=["enum", "dp"], default="enum",
+                    help="enum = tutti i topological sorts, dp = DP sui downset (N=20 in secondi)")
+    ap.add_argument("--dp_limit", type=int, default=20, help="Limite nodi per --exact_solver dp")
+    ap.add_argument("--dp_max_states", type=int, default=1_000_000,
+                    help="Max downset memorizzati dalla DP; oltre si passa al branch-and-bound")
+    ap.add_argument("--exact_workers", type=int, default=1,
+                    help="Processi per --exact_solver enum (ricerca divisa sui prefissi topologici)")
+
+    # branch-and-bound
+    ap.add_argument("--bnb", action="store_true", help="Esegue anche il branch-and-bound (colonne bnb_*)")
+    ap.add_argument("--bnb_limit", type=int, default=20)
+    ap.add_argument("--bnb_incumbent", choices=["greedy", "sa"], default="greedy")
 
     # SA base
     ap.add_argument("--T_start", type=float, default=50.0)
@@ -287,12 +646,41 @@ def main():
     ap.add_argument("--iters_per_T", type=int, default=200)
     ap.add_argument("--max_steps", type=int, default=15000)
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--sa_init", choices=["random", "sidney"], default="random",
+                    help="Soluzione iniziale della SA")
+    ap.add_argument("--sa_time_budget", type=float, default=None, help="Tempo massimo SA (s)")
+    ap.add_argument("--sa_patience", type=int, default=None,
+                    help="Ferma la SA dopo N step senza miglioramento del best")
+    ap.add_argument("--sa_move", choices=["swap", "insert", "mixed"], default="swap",
+                    help="Mossa della SA (insert: solo mosse ammissibili)")
+    ap.add_argument("--ls", choices=["first", "best"], default=None,
+                    help="Ricerca locale dopo greedy c/(1-p) e SA (colonne *_ls_*)")
+
+    # tabu search
+    ap.add_argument("--tabu", action="store_true", help="Esegue anche la tabu search (colonne ts_*)")
+    ap.add_argument("--ts_iters", type=int, default=500)
+    ap.add_argument("--ts_tenure", type=int, default=None, help="Default: max(3, n // 4)")
 
     # auto T
     ap.add_argument("--auto_T", action="store_true", help="Stima T_start per-grafo")
     ap.add_argument("--auto_samples", type=int, default=1000)
     ap.add_argument("--auto_repeats", type=int, default=3)
     ap.add_argument("--auto_p0", type=float, default=0.8)
+    ap.add_argument("--auto_q", type=float, default=0.5, help="Quantile dei delta positivi (0.5 = mediana)")
+    ap.add_argument("--auto_schedule", action="store_true",
+                    help="Usa anche T_end e iters_per_T calibrati")
+    ap.add_argument("--calib_cache", default=".calib_cache",
+                    help="Cartella cache della calibrazione per istanza")
+    ap.add_argument("--no_calib_cache", action="store_true", help="Ricalibra sempre")
+
+    # cache dei risultati esatti (SQLite)
+    # coppia store_true/store_false: BooleanOptionalAction richiede Python >= 3.9
+    ap.add_argument("--cache", dest="cache", action="store_true",
+                    help="Riusa i risultati esatti già calcolati (default)")
+    ap.add_argument("--no-cache", dest="cache", action="store_false",
+                    help="Ricalcola sempre i risultati esatti")
+    ap.set_defaults(cache=True)
+    ap.add_argument("--cache_path", default=CACHE_PATH, help="File SQLite della cache")
 
     args = ap.parse_args()
 
@@ -300,18 +688,41 @@ def main():
         folder=args.folder,
         out_excel=args.out,
         out_csv=args.out_csv,
+        workers=args.workers,
+        journal=args.journal,
+        resume=args.resume,
+        ext=args.ext,
         do_exact=(not args.no_exact),
         exact_limit=args.exact_limit,
+        exact_solver=args.exact_solver,
+        dp_limit=args.dp_limit,
+        dp_max_states=args.dp_max_states,
+        exact_workers=args.exact_workers,
+        do_bnb=args.bnb,
+        bnb_limit=args.bnb_limit,
+        bnb_incumbent=args.bnb_incumbent,
         T_start=args.T_start,
         T_end=args.T_end,
         alpha=args.alpha,
         iters_per_T=args.iters_per_T,
         max_steps=args.max_steps,
         seed=args.seed,
+        sa_init=args.sa_init,
+        sa_time_budget_s=args.sa_time_budget,
+        sa_patience=args.sa_patience,
+        sa_move=args.sa_move,
+        ls=args.ls,
+        do_tabu=args.tabu,
+        ts_iters=args.ts_iters,
+        ts_tenure=args.ts_tenure,
         auto_T=args.auto_T,
         auto_samples=args.auto_samples,
         auto_repeats=args.auto_repeats,
         auto_p0=args.auto_p0,
+        auto_q=args.auto_q,
+        auto_schedule=args.auto_schedule,
+        calib_cache=(None if args.no_calib_cache else args.calib_cache),
+        cache=(args.cache_path if args.cache else None),
     )
 
 
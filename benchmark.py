@@ -0,0 +1,174 @@
+# benchmark.py
+# Micro-benchmark dei solver sui corpora testN*.
+# es run: >python benchmark.py sa --folder testN20 --max_steps 20000
+#         >python benchmark.py load --folder testN20   (JSON vs binario, vedi io_binary.py)
+import os
+import glob
+import time
+import argparse
+import tempfile
+
+from load_graph import load_graph_from_json
+from io_json import load_problem_from_json_bytes
+from io_binary import EXT as BIN_EXT, save_problem_binary, load_problem_binary
+from heuristics import simulated_annealing
+from exact import exact_optimum
+from vector_sa import batch_simulated_annealing
+
+
+def list_json_files(folder):
+    return sorted(glob.glob(os.path.join(folder, "*.json")))
+
+
+def bench_sa(paths, max_steps=20000, iters_per_T=200, seed=42, record_every_step=False):
+    """
+    Steps/secondo di simulated_annealing (T_end molto basso: si ferma a max_steps).
+    Ritorna (steps_totali, secondi_totali).
+    """
+    tot_steps = 0
+    tot_time = 0.0
+    for path in paths:
+        problem = load_graph_from_json(path)
+        t0 = time.perf_counter()
+        simulated_annealing(
+            problem,
+            T_start=50.0,
+            T_end=1e-12,
+            alpha=0.99,
+            iters_per_T=iters_per_T,
+            max_steps=max_steps,
+            seed=seed,
+            record_every_step=record_every_step,
+        )
+        tot_time += time.perf_counter() - t0
+        tot_steps += max_steps
+    return tot_steps, tot_time
+
+
+def bench_vsa(paths, n_chains=64, max_steps=2000, seed=42):
+    """
+    Proposte/secondo di batch_simulated_annealing (n_chains catene in lockstep).
+    Ritorna (proposte_totali, secondi_totali).
+    """
+    tot_props = 0
+    tot_time = 0.0
+    for path in paths:
+        problem = load_graph_from_json(path)
+        _, _, stats = batch_simulated_annealing(
+            problem, n_chains=n_chains, T_start=50.0, T_end=1e-12, alpha=0.99,
+            iters_per_T=200, max_steps=max_steps, seed=seed)
+        tot_props += stats["proposals"]
+        tot_time += stats["time_s"]
+    return tot_props, tot_time
+
+
+def bench_exact(paths, workers=2, split_depth=2, max_nodes=15):
+    """
+    exact_optimum seriale vs parallelo (workers processi) sugli stessi file.
+    Ritorna una lista di (file, t_seriale, t_parallelo, risultati_identici).
+    """
+    rows = []
+    for path in paths:
+        problem = load_graph_from_json(path)
+        if len(problem.nodes) > max_nodes:
+            continue
+        t0 = time.perf_counter()
+        serial = exact_optimum(problem)
+        t_serial = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        parallel = exact_optimum(problem, workers=workers, split_depth=split_depth)
+        t_parallel = time.perf_counter() - t0
+        rows.append((os.path.basename(path), t_serial, t_parallel, serial == parallel))
+    return rows
+
+
+def bench_load(paths, bin_folder, repeats=5):
+    """
+    Tempo medio di caricamento per istanza: JSON (load_graph_from_json e
+    load_problem_from_json_bytes) contro il formato binario (load_problem_binary).
+    I file binari mancanti vengono creati in bin_folder.
+    Ritorna {loader: secondi per istanza}.
+    """
+    os.makedirs(bin_folder, exist_ok=True)
+    bin_paths = []
+    for path in paths:
+        dst = os.path.join(bin_folder, os.path.splitext(os.path.basename(path))[0] + BIN_EXT)
+        if not os.path.exists(dst):
+            save_problem_binary(load_graph_from_json(path), dst)
+        bin_paths.append(dst)
+
+    def json_bytes(path):
+        with open(path, "rb") as f:
+            return load_problem_from_json_bytes(f.read())
+
+    loaders = (
+        ("load_graph_from_json", load_graph_from_json, paths),
+        ("load_problem_from_json_bytes", json_bytes, paths),
+        ("load_problem_binary", load_problem_binary, bin_paths),
+    )
+    out = {}
+    for name, load, files in loaders:
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            for path in files:
+                load(path)
+        out[name] = (time.perf_counter() - t0) / (repeats * len(files))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("what", choices=["sa", "vsa", "exact", "load"], help="Cosa misurare")
+    ap.add_argument("--folder", default="testN20")
+    ap.add_argument("--max_steps", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--record_every_step", action="store_true")
+    ap.add_argument("--chains", type=int, default=64, help="vsa: catene in lockstep")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--split_depth", type=int, default=2)
+    ap.add_argument("--max_nodes", type=int, default=15, help="exact: salta i grafi più grandi")
+    ap.add_argument("--bin_folder", default=None, help="load: cartella dei file binari (default: temporanea)")
+    args = ap.parse_args()
+
+    paths = list_json_files(args.folder)
+    if not paths:
+        raise SystemExit(f"Nessun file .json trovato in: {args.folder}")
+
+    if args.what == "sa":
+        steps, secs = bench_sa(paths, max_steps=args.max_steps, seed=args.seed,
+                               record_every_step=args.record_every_step)
+        print(f"[SA] {len(paths)} file, {steps} step in {secs:.2f}s "
+              f"-> {steps / secs:,.0f} step/s")
+
+    if args.what == "vsa":
+        steps, secs = bench_sa(paths, max_steps=args.max_steps, seed=args.seed)
+        props, vsecs = bench_vsa(paths, n_chains=args.chains,
+                                 max_steps=max(1, args.max_steps // args.chains), seed=args.seed)
+        print(f"[SA scalare]     {steps / secs:,.0f} proposte/s")
+        print(f"[SA vettoriale]  {props / vsecs:,.0f} proposte/s  "
+              f"({args.chains} catene, speedup {(props / vsecs) / (steps / secs):.2f}x)")
+
+    if args.what == "exact":
+        rows = bench_exact(paths, workers=args.workers, split_depth=args.split_depth,
+                           max_nodes=args.max_nodes)
+        if not rows:
+            raise SystemExit(f"Nessun grafo con al più {args.max_nodes} nodi.")
+        for fname, t_s, t_p, same in rows:
+            print(f"  {fname:60s} seriale={t_s:.3f}s  parallelo={t_p:.3f}s  "
+                  f"speedup={t_s / t_p:.2f}x  identico={same}")
+        tot_s = sum(r[1] for r in rows)
+        tot_p = sum(r[2] for r in rows)
+        print(f"[EXACT] {len(rows)} file, workers={args.workers} (cpu={os.cpu_count()}): "
+              f"seriale={tot_s:.2f}s  parallelo={tot_p:.2f}s  speedup={tot_s / tot_p:.2f}x  "
+              f"identici={all(r[3] for r in rows)}")
+
+    if args.what == "load":
+        with tempfile.TemporaryDirectory() as tmp:
+            times = bench_load(paths, args.bin_folder or tmp)
+        base = times["load_graph_from_json"]
+        for name, t in times.items():
+            print(f"[LOAD] {name:30s} {t * 1e3:8.3f} ms/istanza  ({base / t:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# calibration.py
+import os
+import json
+import math
+import hashlib
+
+import numpy as np
+
+from problem import as_compiled
+from sampling import as_random
+from vector_sa import precedence_matrix, batch_expected_cost
+
+
+def quantile(sorted_vals, q):
+    """q in [0,1]. sorted_vals must be sorted."""
+    if not len(sorted_vals):
+        return None
+    if q <= 0:
+        return sorted_vals[0]
+    if q >= 1:
+        return sorted_vals[-1]
+    pos = q * (len(sorted_vals) - 1)
+    lo = int(math.floor(pos))
+    hi = int(math.ceil(pos))
+    if lo == hi:
+        return sorted_vals[lo]
+    frac = pos - lo
+    return sorted_vals[lo] * (1 - frac) + sorted_vals[hi] * frac
+
+
+def sample_positive_deltas(problem, samples=1000, repeats=3, rng=None, A=None):
+    """
+    Delta peggiorativi (> 0) di swap casuali ammissibili, ordinati.
+
+    Per ognuno dei 'repeats' ordini topologici casuali si estraggono 'samples'
+    coppie di posizioni in un colpo solo; l'ammissibilità viene dalla matrice
+    di precedenza permutata sull'ordine, B[a, b] = arco order[a] -> order[b],
+    con somme cumulative per righe e colonne:
+      lo<hi è invalido se order[lo] ha un successore in (lo, hi]
+      oppure order[hi] ha un predecessore in [lo, hi)
+    e i costi degli ordini scambiati sono calcolati tutti insieme
+    (batch_expected_cost).
+
+    rng: random.Random o numpy.Generator (default: nuovo generatore).
+    A: matrice di precedenza già calcolata (default precedence_matrix(problem)).
+    """
+    cp, _ = as_compiled(problem)
+    rng = as_random(rng)
+    n = cp.n
+    if n < 2:
+        return np.empty(0)
+    gen = np.random.default_rng(rng.getrandbits(64))
+    if A is None:
+        A = precedence_matrix(cp)
+    c = np.asarray(cp.cost, dtype=float)
+    p = np.asarray(cp.p, dtype=float)
+
+    out = []
+    for _ in range(repeats):
+        order = np.asarray(cp.random_topological_order(rng), dtype=np.intp)
+        B = A[order][:, order].astype(np.int32)
+        R = np.cumsum(B, axis=1)
+        C = np.cumsum(B, axis=0)
+
+        i = gen.integers(0, n, samples)
+        j = gen.integers(0, n - 1, samples)
+        j += j >= i
+        lo = np.minimum(i, j)
+        hi = np.maximum(i, j)
+
+        succ_between = R[lo, hi] - R[lo, lo]
+        pred_between = C[hi - 1, hi] - np.where(lo > 0, C[np.maximum(lo - 1, 0), hi], 0)
+        ok = (succ_between == 0) & (pred_between == 0)
+        lo = lo[ok]
+        hi = hi[ok]
+        if not len(lo):
+            continue
+
+        rows = np.arange(len(lo))
+        swapped = np.repeat(order[None, :], len(lo), axis=0)
+        swapped[rows, lo] = order[hi]
+        swapped[rows, hi] = order[lo]
+        base = batch_expected_cost(order[None, :], c, p)[0]
+        d = batch_expected_cost(swapped, c, p) - base
+        out.append(d[d > 0])
+
+    if not out:
+        return np.empty(0)
+    return np.sort(np.concatenate(out))
+
+
+def _cache_key(problem, params):
+    cp, _ = as_compiled(problem)
+    h = hashlib.sha256()
+    h.update(cp.content_hash().encode("ascii"))
+    h.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def calibrate(problem, samples=1000, repeats=3, p0=0.8, q=0.5, T_end_frac=0.01,
+              seed=42, rng=None, cache_dir=None):
+    """
+    Calibrazione della SA per un'istanza:
+      d_typ       = quantile q dei delta peggiorativi (q=0.5: mediana)
+      T_start     = -d_typ / ln(p0)   (p0 = prob. di accettare un delta tipico)
+      T_end       = T_start * T_end_frac
+      iters_per_T = 50 * n
+    Restituisce (T_start, d_typ, T_end, iters_per_T), oppure
+    (None, None, None, None) se non stimabile (nessun delta > 0).
+
+    cache_dir: cartella della cache su disco, un file JSON per chiave
+    (impronta del contenuto dell'istanza + parametri). Si usa solo se rng è
+    None, cioè quando il risultato dipende solo da seed.
+    """
+    params = {"samples": samples, "repeats": repeats, "p0": p0, "q": q,
+              "T_end_frac": T_end_frac, "seed": seed}
+    path = None
+    if cache_dir and rng is None:
+        path = os.path.join(cache_dir, _cache_key(problem, params) + ".json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return tuple(json.load(f)["result"])
+        except (OSError, ValueError, KeyError):
+            pass
+
+    cp, _ = as_compiled(problem)
+    deltas = sample_positive_deltas(cp, samples=samples, repeats=repeats,
+                                    rng=as_random(rng, seed))
+    if len(deltas):
+        d_typ = float(quantile(deltas, q))
+        T_start = -d_typ / math.log(p0)
+        result = (T_start, d_typ, T_start * T_end_frac, 50 * cp.n)
+    else:
+        result = (None, None, None, None)
+
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"params": params, "result": result}, f)
+        os.replace(tmp, path)  # scrittura atomica: sicura con più processi
+    return result
+
+
+def estimate_T_start(problem, samples=1000, repeats=3, p0=0.8, seed=42, rng=None,
+                     q=0.5, cache_dir=None):
+    """
+    Stima T_start dal grafo: T_start = -d / ln(p0), con d quantile q
+    (default mediana) dei delta peggiorativi (vedi calibrate).
+    Ritorna (T_start, d_typ) oppure (None, None) se non stimabile.
+    """
+    T_start, d_typ, _, _ = calibrate(problem, samples=samples, repeats=repeats, p0=p0,
+                                     q=q, seed=seed, rng=rng, cache_dir=cache_dir)
+    return T_start, d_typ
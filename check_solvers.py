@@ -0,0 +1,264 @@
+# check_solvers.py
+# Controlli di coerenza tra solver e mosse incrementali.
+# es run: >python check_solvers.py test testN10 testN15
+import os
+import glob
+import random
+import struct
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from load_graph import load_graph_from_json, load_problem_from_data
+from evaluator import OrderEvaluator
+from io_binary import save_problem_binary, load_compiled_binary, _HEADER
+from exact import exact_optimum, exact_dp, exact_branch_and_bound
+from sidney import sidney_solution
+from local_search import local_search
+from heuristics import greedy_solution, simulated_annealing, tabu_search
+from vector_sa import batch_simulated_annealing
+from tempering import parallel_tempering
+
+
+def check_moves(problem, rng, trials=2000):
+    """can_swap/insertion_window vs is_topological_order, delta_* vs rivalutazione completa."""
+    cp = problem.compiled
+    errors = []
+    ev = OrderEvaluator(cp, cp.random_topological_order(rng))
+    for _ in range(trials):
+        i, j = rng.sample(range(cp.n), 2)
+        order = ev.order
+        swapped = list(order)
+        swapped[i], swapped[j] = swapped[j], swapped[i]
+
+        ok = cp.is_topological_order(swapped)
+        if cp.can_swap(order, i, j) != ok:
+            errors.append(f"can_swap({i},{j}) != is_topological_order")
+        if problem.can_swap(cp.decode(order), i, j) != ok:
+            errors.append(f"SequentialTestingProblem.can_swap({i},{j}) != is_topological_order")
+        if not ok:
+            continue
+
+        d = ev.delta_swap(i, j)
+        full = cp.expected_cost(swapped) - ev.cost
+        if abs(d - full) > 1e-9 * max(1.0, abs(ev.cost)):
+            errors.append(f"delta_swap({i},{j})={d} != {full}")
+        if rng.random() < 0.5:
+            ev.commit_swap(i, j, d)
+
+        # inserimento: il nodo in posizione i spostato in posizione j
+        order = ev.order
+        moved = list(order)
+        moved.insert(j, moved.pop(i))
+        lo, hi = cp.insertion_window(order, i)
+        ok = cp.is_topological_order(moved)
+        if (lo <= j <= hi) != ok:
+            errors.append(f"insertion_window({i})=({lo},{hi}) incoerente con j={j}")
+        if not ok:
+            continue
+        d = ev.delta_insert(i, j)
+        full = cp.expected_cost(moved) - ev.cost
+        if abs(d - full) > 1e-9 * max(1.0, abs(ev.cost)):
+            errors.append(f"delta_insert({i},{j})={d} != {full}")
+        if rng.random() < 0.5:
+            ev.commit_insert(i, j, d)
+
+    if abs(ev.cost - cp.expected_cost(ev.order)) > 1e-6 * max(1.0, ev.cost):
+        errors.append("OrderEvaluator.cost diverge dal costo dell'ordine")
+    return errors
+
+
+def check_lazy_masks(path):
+    """
+    Caricamento, greedy, Kahn casuale e costo atteso restano O(n + m): non
+    devono costruire le bitmask di precedenza (O(n^2) bit, create al primo
+    accesso da can_swap/insertion_window e dai solver che le usano).
+    """
+    cp = load_graph_from_json(path).compiled
+    for mode in ("c_over_p", "c_over_fail"):
+        greedy_solution(cp, mode=mode)
+    cp.expected_cost(cp.random_topological_order(random.Random(0)))
+    if cp._pred_mask is not None or cp._succ_mask is not None:
+        return ["greedy/Kahn: bitmask di precedenza costruite senza bisogno"]
+    return []
+
+
+def check_binary(problem):
+    """
+    Round trip nel formato binario (stessa impronta del contenuto) e rifiuto
+    di payload corrotti a mano: p fuori da [0,1], NaN, costo <= 0 o infinito.
+    """
+    errors = []
+    cp = problem.compiled
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "g.stpb")
+        save_problem_binary(cp, path)
+        if load_compiled_binary(path).content_hash() != cp.content_hash():
+            errors.append("io_binary: round trip con contenuto diverso")
+
+        with open(path, "rb") as f:
+            buf = f.read()
+        off_cost = _HEADER.size
+        off_p = off_cost + 8 * cp.n
+        for off, value in ((off_p, 1.5), (off_p, float("nan")), (off_cost, 0.0),
+                           (off_cost, -3.0), (off_cost, float("inf"))):
+            k = (cp.n - 1) * 8
+            bad = buf[:off + k] + struct.pack("<d", value) + buf[off + k + 8:]
+            with open(path, "wb") as f:
+                f.write(bad)
+            try:
+                load_compiled_binary(path)
+                errors.append(f"io_binary: valore corrotto {value} accettato")
+            except ValueError:
+                pass
+    return errors
+
+
+def check_vsa_rng(problem):
+    """
+    Stesso contratto rng degli altri solver (as_random): la SA vettorizzata
+    accetta anche un random.Random, e a parità di stato dà gli stessi risultati.
+    """
+    vsa = [batch_simulated_annealing(problem, n_chains=8, max_steps=200,
+                                     rng=random.Random(0))[:2] for _ in range(2)]
+    if vsa[0] != vsa[1]:
+        return ["batch_simulated_annealing: rng=random.Random(0) non riproducibile"]
+    return []
+
+
+def check_single_node():
+    """
+    Istanza valida con un solo nodo: nessuna mossa possibile, ogni solver
+    deve restituire l'ordine banale invece di fallire.
+    """
+    problem = load_problem_from_data({"nodes": [{"id": "a", "p": 0.5, "cost": 2.0}],
+                                      "edges": []})
+    solvers = {
+        "greedy": lambda: greedy_solution(problem),
+        "sa": lambda: simulated_annealing(problem),
+        "tabu": lambda: tabu_search(problem),
+        "pt": lambda: parallel_tempering(problem, workers=1),
+        "vsa": lambda: batch_simulated_annealing(problem, n_chains=4, max_steps=50),
+    }
+    errors = []
+    for name, run in solvers.items():
+        try:
+            order, cost = run()[:2]
+        except Exception as e:
+            errors.append(f"{name}: istanza a un nodo -> {type(e).__name__}: {e}")
+            continue
+        if list(order) != ["a"] or abs(cost - 2.0) > 1e-12:
+            errors.append(f"{name}: istanza a un nodo -> {order}, {cost}")
+    return errors
+
+
+def check_threads(problem, seeds=range(8), workers=4):
+    """
+    SA e tabu search lanciate in parallelo su un pool di thread devono dare
+    esattamente gli stessi risultati delle esecuzioni in serie (nessuno stato
+    globale condiviso tra le ricerche).
+    """
+    def solve(seed):
+        sa = simulated_annealing(problem, T_start=50.0, T_end=1.0, alpha=0.99,
+                                 max_steps=2000, seed=seed, record_every_step=False)
+        ts = tabu_search(problem, max_iters=30, seed=seed)
+        return sa[:2], ts[:2]
+
+    serial = [solve(s) for s in seeds]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        threaded = list(pool.map(solve, seeds))
+    if serial != threaded:
+        return ["SA/tabu: risultati diversi in serie e su thread concorrenti"]
+    return []
+
+
+def check_exact(problem, enum_limit=11):
+    """
+    exact_dp vs exact_optimum (grafi piccoli), exact_branch_and_bound vs exact_dp,
+    local_search (ammissibile, ottimo locale), tabu_search e sidney_solution vs exact_dp sui
+    DAG serie-paralleli.
+    """
+    errors = []
+    dp_order, dp_cost, _ = exact_dp(problem)
+    tol = 1e-9 * max(1.0, dp_cost)
+
+    if not problem.is_topological_order(dp_order):
+        errors.append("exact_dp: ordine non topologico")
+    if abs(problem.expected_cost(dp_order) - dp_cost) > tol:
+        errors.append("exact_dp: costo != costo dell'ordine")
+
+    if len(problem.nodes) <= enum_limit:
+        _, enum_cost = exact_optimum(problem)
+        if abs(enum_cost - dp_cost) > tol:
+            errors.append(f"exact_dp={dp_cost} != exact_optimum={enum_cost}")
+
+    bnb_order, bnb_cost, _ = exact_branch_and_bound(problem)
+    if abs(bnb_cost - dp_cost) > tol or not problem.is_topological_order(bnb_order):
+        errors.append(f"exact_branch_and_bound={bnb_cost} != exact_dp={dp_cost}")
+
+    # ricerca locale: ordine ammissibile, non sotto l'ottimo, e ottimo locale
+    # (una seconda ricerca non trova mosse migliorative)
+    start = problem.random_topological_order(random.Random(0))
+    for strategy in ("first", "best"):
+        ls_order, ls_cost, _ = local_search(problem, start, strategy=strategy)
+        if not problem.is_topological_order(ls_order) or ls_cost < dp_cost - tol:
+            errors.append(f"local_search({strategy})={ls_cost} non ammissibile o < exact_dp={dp_cost}")
+        _, _, again = local_search(problem, ls_order, strategy=strategy)
+        if sum(again["moves"].values()):
+            errors.append(f"local_search({strategy}): il risultato non è un ottimo locale")
+
+    ts_order, ts_cost, _ = tabu_search(problem, max_iters=100)
+    if not problem.is_topological_order(ts_order) or ts_cost < dp_cost - tol:
+        errors.append(f"tabu_search={ts_cost} non ammissibile o < exact_dp={dp_cost}")
+    if abs(problem.expected_cost(ts_order) - ts_cost) > tol:
+        errors.append("tabu_search: costo != costo dell'ordine")
+
+    sp_order, sp_cost, info = sidney_solution(problem)
+    if not problem.is_topological_order(sp_order):
+        errors.append("sidney_solution: ordine non topologico")
+    elif info["series_parallel"] and abs(sp_cost - dp_cost) > tol:
+        errors.append(f"sidney_solution={sp_cost} != exact_dp={dp_cost} (DAG serie-parallelo)")
+    return errors
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("folders", nargs="+", help="Cartelle con i .json (es: test testN10)")
+    ap.add_argument("--trials", type=int, default=2000, help="Swap casuali per istanza")
+    ap.add_argument("--enum_limit", type=int, default=11, help="Max nodi per exact_optimum")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    n_files, n_fail = 0, 0
+
+    errors = check_single_node()
+    if errors:
+        n_fail += 1
+        print("FAIL istanza a un nodo")
+        for e in errors:
+            print("   ", e)
+
+    for folder in args.folders:
+        for path in sorted(glob.glob(os.path.join(folder, "*.json"))):
+            problem = load_graph_from_json(path)
+            errors = check_lazy_masks(path)
+            errors += check_moves(problem, rng, trials=args.trials)
+            errors += check_binary(problem)
+            errors += check_exact(problem, enum_limit=args.enum_limit)
+            errors += check_threads(problem)
+            errors += check_vsa_rng(problem)
+            n_files += 1
+            if errors:
+                n_fail += 1
+                print(f"FAIL {path}")
+                for e in errors:
+                    print("   ", e)
+
+    print(f"\n{n_files} istanze controllate, {n_fail} con errori")
+    if n_fail:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# evaluator.py
+from problem import as_compiled
+
+
+class OrderEvaluator:
+    """
+    Valutatore incrementale del costo atteso, agganciato a un ordine (di indici).
+
+    Mantiene:
+    - order  : l'ordine corrente (copia propria, modificata solo da commit_*)
+    - reach  : prodotti prefissi, reach[k] = prod_{t<k} p[order[t]]  (len n+1)
+    - cost   : costo atteso corrente
+
+    Uno swap delle posizioni i<j cambia solo i termini in [i, j]: il prodotto
+    p su [i, j] non cambia, quindi reach[j+1:] e il contributo del suffisso
+    restano identici. delta_swap costa O(j - i) e non dipende da n.
+    Lo stesso vale per l'inserimento (il nodo in posizione i spostato in
+    posizione j): delta_insert / commit_insert costano O(|j - i|).
+    """
+    def __init__(self, problem, order):
+        self.problem, _ = as_compiled(problem)
+        self.order = list(order)
+        self.reach = [1.0] * (len(self.order) + 1)
+        self.cost = 0.0
+        self.resync()
+
+    def resync(self):
+        """Ricalcola da zero reach e cost (elimina la deriva numerica dei delta)."""
+        c = self.problem.cost
+        p = self.problem.p
+        reach = self.reach
+        r = 1.0
+        total = 0.0
+        for k, v in enumerate(self.order):
+            reach[k] = r
+            total += c[v] * r
+            r *= p[v]
+        reach[len(self.order)] = r
+        self.cost = total
+        return total
+
+    def delta_swap(self, i, j):
+        """Variazione del costo atteso se si scambiano le posizioni i e j."""
+        if i == j:
+            return 0.0
+        if i > j:
+            i, j = j, i
+
+        c = self.problem.cost
+        p = self.problem.p
+        order = self.order
+        reach = self.reach
+        u = order[i]
+        w = order[j]
+
+        # vecchio contributo del segmento [i, j] vs nuovo (w ... u)
+        old = c[u] * reach[i] + c[w] * reach[j]
+        r = reach[i]
+        new = c[w] * r
+        r *= p[w]
+        for k in range(i + 1, j):
+            v = order[k]
+            old += c[v] * reach[k]
+            new += c[v] * r
+            r *= p[v]
+        new += c[u] * r
+        return new - old
+
+    def commit_swap(self, i, j, delta=None):
+        """Applica lo swap i,j all'ordine (in place) e aggiorna reach/cost in O(j - i)."""
+        if i == j:
+            return
+        if i > j:
+            i, j = j, i
+        if delta is None:
+            delta = self.delta_swap(i, j)
+
+        order = self.order
+        order[i], order[j] = order[j], order[i]
+
+        p = self.problem.p
+        reach = self.reach
+        r = reach[i]
+        for k in range(i, j):
+            r *= p[order[k]]
+            reach[k + 1] = r
+        self.cost += delta
+
+    def delta_insert(self, i, j):
+        """Variazione del costo atteso se il nodo in posizione i viene spostato in posizione j."""
+        if i == j:
+            return 0.0
+
+        c = self.problem.cost
+        p = self.problem.p
+        order = self.order
+        reach = self.reach
+        u = order[i]
+
+        if i < j:
+            # [u, a.., b] -> [a.., b, u]
+            r = reach[i]
+            old = c[u] * r
+            new = 0.0
+            for k in range(i + 1, j + 1):
+                v = order[k]
+                old += c[v] * reach[k]
+                new += c[v] * r
+                r *= p[v]
+            new += c[u] * r
+        else:
+            # [a.., b, u] -> [u, a.., b]
+            r = reach[j]
+            old = c[u] * reach[i]
+            new = c[u] * r
+            r *= p[u]
+            for k in range(j, i):
+                v = order[k]
+                old += c[v] * reach[k]
+                new += c[v] * r
+                r *= p[v]
+        return new - old
+
+    def commit_insert(self, i, j, delta=None):
+        """Sposta il nodo in posizione i in posizione j (in place) e aggiorna reach/cost."""
+        if i == j:
+            return
+        if delta is None:
+            delta = self.delta_insert(i, j)
+
+        order = self.order
+        order.insert(j, order.pop(i))
+
+        lo = min(i, j)
+        hi = max(i, j)
+        p = self.problem.p
+        reach = self.reach
+        r = reach[lo]
+        for k in range(lo, hi):
+            r *= p[order[k]]
+            reach[k + 1] = r
+        self.cost += delta
+
+    def insert_deltas(self, i):
+        """
+        Tutti gli inserimenti ammissibili del nodo in posizione i: genera
+        (j, delta_insert(i, j)) per ogni j != i nella finestra ammissibile.
+        I delta sono accumulati scavalcando un nodo alla volta: O(finestra).
+        """
+        cp = self.problem
+        c = cp.cost
+        p = cp.p
+        order = self.order
+        reach = self.reach
+        u = order[i]
+        cu = c[u]
+        qu = 1.0 - p[u]
+        pm = cp.pred_mask[u]
+        sm = cp.succ_mask[u]
+
+        # verso destra: u scavalca order[i+1], order[i+2], ... fino al primo successore
+        d = 0.0
+        r = reach[i]
+        for k in range(i + 1, len(order)):
+            w = order[k]
+            if (sm >> w) & 1:
+                break
+            d += r * (c[w] * qu - cu * (1.0 - p[w]))
+            r *= p[w]
+            yield k, d
+
+        # verso sinistra: u scavalca order[i-1], order[i-2], ... fino al primo predecessore
+        d = 0.0
+        for k in range(i - 1, -1, -1):
+            w = order[k]
+            if (pm >> w) & 1:
+                break
+            d += reach[k] * (cu * (1.0 - p[w]) - c[w] * qu)
+            yield k, d
@@ -1,10 +1,14 @@
 # exact.py
-import networkx as nx
+import time
 
+from problem import as_compiled
+from heuristics import greedy_solution, simulated_annealing
 
-def all_topological_sorts(G: nx.DiGraph):
+
+def all_topological_sorts(G):
     """
-    Generatore: enumera tutti gli ordinamenti topologici (backtracking).
+    Generatore: enumera tutti gli ordinamenti topologici (backtracking) di un
+    networkx.DiGraph.
     Attenzione: può esplodere -> usarlo solo per pochi nodi.
     """
     indeg = {u: G.in_degree(u) for u in G.nodes()}
@@ -37,15 +41,354 @@ def all_topological_sorts(G: nx.DiGraph):
     yield from backtrack()
 
 
-def exact_optimum(problem):
-    """Trova ordine ottimo enumerando tutti i topological sorts."""
+def improving_topological_sorts(problem):
+    """
+    Generatore: backtracking sugli ordinamenti topologici che porta con sé
+    il costo parziale e la prob. di arrivo del prefisso (niente rivalutazione
+    delle foglie) e pota ogni ramo con costo parziale >= best, perché i
+    termini successivi sono tutti >= 0.
+
+    Produce SOLO le soluzioni che migliorano strettamente la precedente,
+    come coppie (ordine, costo); l'ordine (di indici, o di id originali se
+    'problem' non è compilato) viene copiato solo a ogni miglioramento.
+    Il costo parziale si accumula nello stesso ordine di expected_cost,
+    quindi i costi coincidono bit per bit con quelli della valutazione completa.
+    """
+    cp, decode = as_compiled(problem)
+    n = cp.n
+    cost = cp.cost
+    p = cp.p
+    succs = cp.succs
+    nodes = cp.nodes
+    indeg = list(cp.indeg)
+    used = [False] * n
+    order = []
+    best = [float("inf")]
+
+    def backtrack(acc, reach):
+        if len(order) == n:
+            if acc < best[0]:
+                best[0] = acc
+                yield decode(order), acc
+            return
+
+        for u in nodes:
+            if used[u] or indeg[u] != 0:
+                continue
+            new_acc = acc + cost[u] * reach
+            if new_acc >= best[0]:
+                continue
+
+            used[u] = True
+            order.append(u)
+            for v in succs[u]:
+                indeg[v] -= 1
+
+            yield from backtrack(new_acc, reach * p[u])
+
+            for v in succs[u]:
+                indeg[v] += 1
+            order.pop()
+            used[u] = False
+
+    yield from backtrack(0.0, 1.0)
+
+
+def _topological_prefixes(cp, depth):
+    """Tutti i prefissi topologici lunghi min(depth, n), in ordine di enumerazione."""
+    out = []
+    depth = min(depth, cp.n)
+
+    def extend(prefix, S):
+        if len(prefix) == depth:
+            out.append(tuple(prefix))
+            return
+        for u in cp.nodes:
+            if not (S >> u) & 1 and (cp.pred_mask[u] & S) == cp.pred_mask[u]:
+                prefix.append(u)
+                extend(prefix, S | (1 << u))
+                prefix.pop()
+
+    extend([], 0)
+    return out
+
+
+def _subtree_best(cp, prefix, shared=None, sync_every=1024):
+    """
+    Miglior completamento (primo in ordine di enumerazione) degli ordinamenti
+    topologici che iniziano con 'prefix'. Restituisce (ordine, costo) oppure
+    (None, inf) se tutto il sotto-albero è stato potato.
+
+    shared: multiprocessing.Value('d') con il best globale tra i worker.
+    Il bound condiviso pota solo in senso stretto (> shared): un completamento
+    di costo pari all'ottimo globale non viene mai scartato, così la fusione
+    dei risultati dà lo stesso ordine del solver seriale.
+    """
+    n = cp.n
+    cost = cp.cost
+    p = cp.p
+    succs = cp.succs
+    nodes = cp.nodes
+    indeg = list(cp.indeg)
+    used = [False] * n
+    order = []
+
+    acc, reach = 0.0, 1.0
+    for u in prefix:
+        used[u] = True
+        order.append(u)
+        for v in succs[u]:
+            indeg[v] -= 1
+        acc += cost[u] * reach
+        reach *= p[u]
+
+    state = {"best": float("inf"), "order": None,
+             "bound": shared.value if shared is not None else float("inf"),
+             "ticks": 0}
+
+    def backtrack(acc, reach):
+        if shared is not None:
+            state["ticks"] += 1
+            if state["ticks"] >= sync_every:
+                state["ticks"] = 0
+                state["bound"] = shared.value
+
+        if len(order) == n:
+            if acc < state["best"] and acc <= state["bound"]:
+                state["best"] = acc
+                state["order"] = list(order)
+                if shared is not None:
+                    with shared.get_lock():
+                        if acc < shared.value:
+                            shared.value = acc
+                    state["bound"] = shared.value
+            return
+
+        for u in nodes:
+            if used[u] or indeg[u] != 0:
+                continue
+            new_acc = acc + cost[u] * reach
+            if new_acc >= state["best"] or new_acc > state["bound"]:
+                continue
+
+            used[u] = True
+            order.append(u)
+            for v in succs[u]:
+                indeg[v] -= 1
+
+            backtrack(new_acc, reach * p[u])
+
+            for v in succs[u]:
+                indeg[v] += 1
+            order.pop()
+            used[u] = False
+
+    backtrack(acc, reach)
+    return state["order"], state["best"]
+
+
+# stato dei worker del pool (impostato da _init_worker)
+_worker_cp = None
+_worker_shared = None
+
+
+def _init_worker(cp, shared):
+    global _worker_cp, _worker_shared
+    _worker_cp = cp
+    _worker_shared = shared
+
+
+def _solve_prefix(task):
+    k, prefix = task
+    order, c = _subtree_best(_worker_cp, prefix, _worker_shared)
+    return k, order, c
+
+
+def exact_optimum(problem, workers=None, split_depth=2):
+    """
+    Trova ordine ottimo enumerando i topological sorts, con costo accumulato
+    sul prefisso e potatura dei rami che non possono migliorare il best.
+
+    workers > 1: l'albero di ricerca viene diviso sui prefissi topologici dei
+    primi split_depth livelli, risolti in un pool di processi che condividono
+    il best corrente (multiprocessing.Value) per potare. A parità di costo
+    vince il prefisso che viene prima nell'enumerazione, quindi il risultato
+    è identico a quello seriale.
+    """
+    if not workers or workers <= 1:
+        best_order = None
+        best_cost = float("inf")
+        for order, c in improving_topological_sorts(problem):
+            best_order, best_cost = order, c
+        return best_order, best_cost
+
+    import multiprocessing as mp
+
+    cp, decode = as_compiled(problem)
+    tasks = list(enumerate(_topological_prefixes(cp, split_depth)))
+    shared = mp.Value("d", float("inf"))
+
+    results = []
+    with mp.Pool(workers, initializer=_init_worker, initargs=(cp, shared)) as pool:
+        for k, order, c in pool.imap_unordered(_solve_prefix, tasks):
+            if order is not None:
+                results.append((c, k, order))
+
+    if not results:
+        return None, float("inf")
+    c, _, order = min(results, key=lambda r: (r[0], r[1]))
+    return decode(order), c
+
+
+def exact_dp(problem, max_states=1_000_000):
+    """
+    Ottimo esatto con programmazione dinamica sui downset (ideali) del DAG.
+
+    Se S è l'insieme dei test già eseguiti (un downset, codificato come bitmask),
+    il costo residuo vale prod_{j in S} p_j * h(S), con
+        h(S) = min_{v eseguibile} c_v + p_v * h(S ∪ {v}),   h(V) = 0
+    quindi h dipende solo da S: basta memoizzare h sui downset raggiungibili.
+
+    I downset possono essere fino a 2^n (DAG senza archi): max_states limita
+    quelli memorizzati (ValueError se superato, ~250 byte per stato).
+
+    Restituisce: best_order, best_cost, stats  (stats["states"] = downset visitati)
+    """
+    cp, decode = as_compiled(problem)
+    n = cp.n
+    full = (1 << n) - 1
+    cost = cp.cost
+    p = cp.p
+    pred_mask = cp.pred_mask
+    nodes = cp.nodes
+
+    # memo[S] = (h(S), nodo scelto in S)
+    memo = {full: (0.0, None)}
+
+    def h(S):
+        hit = memo.get(S)
+        if hit is not None:
+            return hit[0]
+        best_val = float("inf")
+        best_v = None
+        for v in nodes:
+            if (S >> v) & 1 or (pred_mask[v] & S) != pred_mask[v]:
+                continue
+            val = cost[v] + p[v] * h(S | (1 << v))
+            if val < best_val:
+                best_val = val
+                best_v = v
+        if len(memo) >= max_states:
+            raise ValueError(f"Troppi downset (> {max_states}): usa exact_branch_and_bound.")
+        memo[S] = (best_val, best_v)
+        return best_val
+
+    best_cost = h(0)
+
+    # ricostruzione dell'ordine ottimo seguendo le scelte memorizzate
+    order = []
+    S = 0
+    while S != full:
+        v = memo[S][1]
+        order.append(v)
+        S |= 1 << v
+
+    stats = {"states": len(memo)}
+    return decode(order), best_cost, stats
+
+
+def exact_branch_and_bound(problem, incumbent="greedy", sa_steps=2000, seed=42):
+    """
+    Branch-and-bound depth-first sugli ordinamenti topologici.
+
+    - incumbent iniziale: greedy_solution(mode="c_over_fail") ("greedy"),
+      una SA breve di sa_steps passi ("sa") oppure nessuno (None)
+    - lower bound di un ordine parziale (costo acc, prob. di arrivo R,
+      nodi rimanenti U): acc + R * costo ottimo di U ignorando le precedenze,
+      cioè U ordinato per c/(1-p) crescente (regola del rapporto, ottima
+      senza vincoli). Se il bound non migliora l'incumbent il ramo è potato.
+    - dominanza: la prob. di arrivo dopo un insieme S non dipende dall'ordine
+      interno, quindi se S è già stato raggiunto con costo parziale <= acc
+      il ramo corrente non può fare meglio (nodes_dominated)
+    - i figli sono esplorati in ordine di c/(1-p), così l'incumbent migliora presto
+
+    Restituisce: best_order, best_cost, stats con
+      nodes_explored, nodes_pruned, nodes_dominated, incumbent_cost,
+      t_best_s   (secondi al ritrovamento dell'ordine ottimo)
+      t_proved_s (secondi alla fine della ricerca = ottimalità dimostrata)
+    """
+    cp, decode = as_compiled(problem)
+    t0 = time.perf_counter()
+    n = cp.n
+    cost = cp.cost
+    p = cp.p
+    pred_mask = cp.pred_mask
+
+    def ratio(v):
+        q = 1.0 - p[v]
+        return cost[v] / q if q > 0 else float("inf")
+
+    by_ratio = sorted(cp.nodes, key=ratio)
+
     best_order = None
     best_cost = float("inf")
+    if incumbent == "greedy":
+        best_order, best_cost = greedy_solution(cp, mode="c_over_fail")
+    elif incumbent == "sa":
+        best_order, best_cost, _ = simulated_annealing(
+            cp, max_steps=sa_steps, seed=seed, record_every_step=False)
+    elif incumbent is not None:
+        raise ValueError("incumbent must be 'greedy', 'sa' or None")
+    incumbent_cost = best_cost
+    t_best = time.perf_counter() - t0
+
+    stats = {"nodes_explored": 0, "nodes_pruned": 0, "nodes_dominated": 0}
+    order = []
+    seen = {}  # downset S -> miglior costo parziale con cui è stato raggiunto
+
+    def relaxed_cost(S):
+        # costo ottimo dei nodi fuori da S senza precedenze (ordine per rapporto)
+        total = 0.0
+        r = 1.0
+        for v in by_ratio:
+            if not (S >> v) & 1:
+                total += cost[v] * r
+                r *= p[v]
+        return total
+
+    def dfs(S, acc, reach):
+        nonlocal best_order, best_cost, t_best
+        stats["nodes_explored"] += 1
+
+        if len(order) == n:
+            if acc < best_cost:
+                best_cost = acc
+                best_order = list(order)
+                t_best = time.perf_counter() - t0
+            return
+
+        if seen.get(S, float("inf")) <= acc:
+            stats["nodes_dominated"] += 1
+            return
+        seen[S] = acc
+
+        if acc + reach * relaxed_cost(S) >= best_cost:
+            stats["nodes_pruned"] += 1
+            return
+
+        for v in by_ratio:
+            if (S >> v) & 1 or (pred_mask[v] & S) != pred_mask[v]:
+                continue
+            order.append(v)
+            dfs(S | (1 << v), acc + reach * cost[v], reach * p[v])
+            order.pop()
+
+    dfs(0, 0.0, 1.0)
 
-    for order in all_topological_sorts(problem.G):
-        c = problem.expected_cost(order)
-        if c < best_cost:
-            best_cost = c
-            best_order = order
+    stats["incumbent_cost"] = incumbent_cost
+    stats["t_best_s"] = t_best
+    stats["t_proved_s"] = time.perf_counter() - t0
 
-    return best_order, best_cost
+    if best_order is None:
+        return None, best_cost, stats
+    return decode(best_order), best_cost, stats
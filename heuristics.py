@@ -1,8 +1,20 @@
 # heuristics.py
-import random
+import heapq
 import math
 import time
 
+from problem import as_compiled
+from evaluator import OrderEvaluator
+from history import SearchHistory
+from sampling import as_random
+
+
+# regole di score per greedy_solution: score(cost, p_success), minore = prima
+GREEDY_SCORES = {
+    "c_over_p": lambda c, p: c / p,
+    "c_over_fail": lambda c, p: c / max(1e-12, 1.0 - p),
+}
+
 
 def greedy_solution(problem, mode="c_over_p"):
     """
@@ -12,124 +24,404 @@ def greedy_solution(problem, mode="c_over_p"):
     mode:
       - "c_over_p"    : cost / p_success  (la tua attuale baseline)
       - "c_over_fail" : cost / (1 - p_success)  (più coerente col costo atteso con stop)
+      - una funzione score(cost, p_success) -> valore da minimizzare
+        (le regole con nome sono in GREEDY_SCORES)
+
+    Gli score sono calcolati una volta sola e i disponibili stanno in uno heap
+    con chiave (score, contatore di inserimento): a parità di score vince il
+    nodo diventato disponibile per primo, come con la vecchia scansione
+    lineare della lista. O((n + m) log n).
+
+    problem può essere un SequentialTestingProblem o direttamente la sua forma
+    compilata (in quel caso l'ordine restituito è di indici).
     """
-    G = problem.G
-    indeg = {u: G.in_degree(u) for u in G.nodes()}
+    cp, decode = as_compiled(problem)
+    if callable(mode):
+        score = mode
+    elif mode in GREEDY_SCORES:
+        score = GREEDY_SCORES[mode]
+    else:
+        raise ValueError("mode must be 'c_over_p', 'c_over_fail' or a callable score(cost, p)")
+
+    scores = [score(c, p) for c, p in zip(cp.cost, cp.p)]
+    indeg = list(cp.indeg)
     chosen = []
-    used = set()
-
-    available = [u for u in G.nodes() if indeg[u] == 0]
-
-    def score(u):
-        c = problem.test_data[u].cost
-        p = problem.test_data[u].p_success
-        if mode == "c_over_p":
-            return c / p
-        elif mode == "c_over_fail":
-            q = max(1e-12, 1.0 - p)
-            return c / q
-        else:
-            raise ValueError("mode must be 'c_over_p' or 'c_over_fail'")
 
-    while available:
-        best = min(available, key=score)
+    heap = [(scores[u], k, u) for k, u in enumerate(u for u in cp.nodes if indeg[u] == 0)]
+    heapq.heapify(heap)
+    counter = len(heap)
+
+    while heap:
+        _, _, best = heapq.heappop(heap)
         chosen.append(best)
-        used.add(best)
-        available.remove(best)
 
-        for v in G.successors(best):
+        for v in cp.succs[best]:
             indeg[v] -= 1
-            if indeg[v] == 0 and v not in used:
-                available.append(v)
+            if indeg[v] == 0:
+                heapq.heappush(heap, (scores[v], counter, v))
+                counter += 1
 
-    return chosen, problem.expected_cost(chosen)
+    return decode(chosen), cp.expected_cost(chosen)
 
 
 def simulated_annealing(problem, T_start=1.0, T_end=1e-3, alpha=0.98,
                        iters_per_T=200, max_steps=15000, seed=42,
-                       record_every_step=True):
+                       record_every_step=True, init_order=None,
+                       history_every=1, history_bucket=None,
+                       time_budget_s=None, patience=None, patience_s=None,
+                       callback=None, move="swap", rng=None):
     """
-    Simulated Annealing con mossa = swap.
+    Simulated Annealing con mossa = swap e/o inserimento.
     Restituisce: best_order, best_cost, history
 
     Se record_every_step=True  -> history contiene un record per ogni step (più pesante).
     Se record_every_step=False -> history contiene SOLO l'iniziale + i miglioramenti del best
                                  (perfetto per batch + tempo del best finale).
     Ogni record include anche t_s = secondi trascorsi dall'inizio della SA.
+    history è una SearchHistory (colonne numpy step/T/current_cost/best_cost/t_s,
+    to_numpy()/to_dataframe()); h[k] restituisce ancora il record come dict.
+    Con record_every_step=True si può sottocampionare a dimensione fissa:
+      history_every=k     -> uno step ogni k
+      history_bucket=b    -> min/max di current_cost per blocco di b step
+
+    move: "swap"   -> scambio di due posizioni casuali (scartato se viola i vincoli)
+          "insert" -> un nodo viene spostato in una posizione della sua finestra
+                      ammissibile (CompiledProblem.insertion_window): si
+                      propongono solo mosse ammissibili
+          "mixed"  -> swap o inserimento con probabilità 1/2
+    Le statistiche per tipo di mossa sono in history.move_stats:
+      {tipo: {"proposed", "infeasible", "rejected", "accepted", "rejected_rate"}}
+    con rejected_rate = (infeasible + rejected) / proposed.
+
+    init_order: ordine topologico di partenza (es. sidney_solution o greedy);
+                se None si parte da random_topological_order().
+
+    rng: random.Random o numpy.Generator privato della ricerca; se None si usa
+         random.Random(seed). Lo stato globale del modulo random non viene
+         toccato: più ricerche nello stesso processo (thread, server) non
+         interferiscono e a parità di seed danno lo stesso risultato.
+
+    Arresto anticipato (anytime), oltre a T <= T_end e max_steps:
+      time_budget_s -> tempo massimo di esecuzione in secondi
+      patience      -> step consecutivi senza miglioramento del best
+      patience_s    -> secondi consecutivi senza miglioramento del best
+      callback      -> callback(step, best_order, best_cost) a ogni nuovo best
+                       (best_order negli id originali); se restituisce True
+                       la ricerca si ferma.
+    Il tempo è controllato ogni 256 step. Il motivo dell'arresto è in
+    history.stop_reason: "T_end", "max_steps", "time_budget", "patience",
+    "callback" o "no_moves" (istanza con un solo nodo).
+
+    Il ciclo lavora sulla forma compilata (indici): best_order viene tradotto
+    negli id originali solo in uscita. Il costo dei vicini è valutato in modo
+    incrementale (OrderEvaluator.delta_swap), le mosse accettate sono applicate
+    in place e il best viene copiato solo quando serve (log delle mosse).
+    Nota: i delta incrementali arrotondano diversamente da un ricalcolo completo,
+    quindi a parità di seed la traiettoria può differire da quella delle
+    versioni che rivalutavano l'intero ordine.
     """
-    random.seed(seed)
+    cp, decode = as_compiled(problem)
+    if move not in ("swap", "insert", "mixed"):
+        raise ValueError("move must be 'swap', 'insert' or 'mixed'")
+    rng = as_random(rng, seed)
     t0 = time.perf_counter()
 
-    current = problem.random_topological_order()
-    current_cost = problem.expected_cost(current)
+    # stato mutabile: l'ordine corrente è modificato in place dal valutatore
+    if init_order is None:
+        start = cp.random_topological_order(rng)
+    else:
+        start = list(init_order) if cp is problem else cp.encode(init_order)
+        if not cp.is_topological_order(start):
+            raise ValueError("init_order non è un ordinamento topologico valido.")
+    ev = OrderEvaluator(cp, start)
+    current = ev.order
+    current_cost = ev.cost
+    n = len(current)
 
-    best = list(current)
+    # best "pigro": best is None -> il best è current con le mosse in best_log
+    # annullate a ritroso; lo si materializza solo se il log supera n mosse.
+    best = None
+    best_log = []
     best_cost = current_cost
 
-    history = [{
-        "step": 0,
-        "T": T_start,
-        "current_cost": current_cost,
-        "best_cost": best_cost,
-        "t_s": 0.0
-    }]
+    if record_every_step:
+        history = SearchHistory.for_steps(max_steps, every=history_every, bucket=history_bucket)
+    else:
+        history = SearchHistory()
+    record = history.append
+    record(0, T_start, current_cost, best_cost, 0.0)
+
+    positions = range(n)
+    sample = rng.sample
+    rand = rng.random
+    randrange = rng.randrange
+    can_swap = cp.can_swap
+    window = cp.insertion_window
+    delta_swap = ev.delta_swap
+    commit_swap = ev.commit_swap
+    delta_insert = ev.delta_insert
+    commit_insert = ev.commit_insert
+
+    # contatori per tipo di mossa: [proposte, non ammissibili, accettate]
+    swap_cnt = [0, 0, 0]
+    insert_cnt = [0, 0, 0]
+    insert_only = move == "insert"
+    mixed = move == "mixed"
 
     T = T_start
     step = 0
 
-    while T > T_end and step < max_steps:
-        for _ in range(iters_per_T):
-            step += 1
+    deadline = None if time_budget_s is None else t0 + time_budget_s
+    check_clock = deadline is not None or patience_s is not None
+    last_best_step = 0
+    last_best_t = t0
+    # con un solo nodo non esiste nessuna mossa (come in tabu_search)
+    stop_reason = None if n > 1 else "no_moves"
 
-            i, j = random.sample(range(len(current)), 2)
-            neighbor = problem.try_swap(current, i, j)
-
-            # swap invalido -> non cambia nulla
-            if neighbor is None:
-                if record_every_step:
-                    history.append({
-                        "step": step,
-                        "T": T,
-                        "current_cost": current_cost,
-                        "best_cost": best_cost,
-                        "t_s": time.perf_counter() - t0
-                    })
-                if step >= max_steps:
-                    break
-                continue
+    while stop_reason is None:
+        if T <= T_end:
+            stop_reason = "T_end"
+            break
+        if step >= max_steps:
+            stop_reason = "max_steps"
+            break
 
-            neighbor_cost = problem.expected_cost(neighbor)
-            delta = neighbor_cost - current_cost
+        for _ in range(iters_per_T):
+            step += 1
 
-            accept = (delta < 0) or (random.random() < math.exp(-delta / T))
+            # mossa invalida -> non cambia nulla (delta None).
+            # delta incrementale: solo i termini tra i e j cambiano.
+            # La mossa viene applicata solo se accettata: un rifiuto non
+            # tocca lo stato.
+            if insert_only or (mixed and rand() < 0.5):
+                cnt = insert_cnt
+                i = randrange(n)
+                lo, hi = window(current, i)
+                if hi > lo:
+                    j = lo + randrange(hi - lo)
+                    if j >= i:
+                        j += 1
+                    delta = delta_insert(i, j)
+                else:
+                    delta = None
+            else:
+                cnt = swap_cnt
+                i, j = sample(positions, 2)
+                delta = delta_swap(i, j) if can_swap(current, i, j) else None
+            cnt[0] += 1
 
-            if accept:
-                current, current_cost = neighbor, neighbor_cost
+            if delta is None:
+                cnt[1] += 1
+            else:
+                if (delta < 0) or (rand() < math.exp(-delta / T)):
+                    cnt[2] += 1
+                    is_insert = cnt is insert_cnt
+                    if is_insert:
+                        commit_insert(i, j, delta)
+                    else:
+                        commit_swap(i, j, delta)
+                    current_cost = ev.cost
 
-                # miglioramento best
-                if current_cost < best_cost:
-                    best, best_cost = list(current), current_cost
-                    if not record_every_step:
-                        history.append({
-                            "step": step,
-                            "T": T,
-                            "current_cost": current_cost,
-                            "best_cost": best_cost,
-                            "t_s": time.perf_counter() - t0
-                        })
+                    # miglioramento best
+                    if current_cost < best_cost:
+                        best, best_cost = None, current_cost
+                        best_log.clear()
+                        last_best_step = step
+                        if check_clock or not record_every_step:
+                            last_best_t = time.perf_counter()
+                        if not record_every_step:
+                            record(step, T, current_cost, best_cost, last_best_t - t0)
+                        if callback is not None and callback(step, decode(list(current)), best_cost):
+                            stop_reason = "callback"
+                    elif best is None:
+                        best_log.append((i, j, is_insert))
+                        if len(best_log) > n:
+                            best = _rewind_moves(current, best_log)
+                            best_log.clear()
 
             if record_every_step:
-                history.append({
-                    "step": step,
-                    "T": T,
-                    "current_cost": current_cost,
-                    "best_cost": best_cost,
-                    "t_s": time.perf_counter() - t0
-                })
+                record(step, T, current_cost, best_cost, time.perf_counter() - t0)
 
+            if stop_reason is not None:
+                break
             if step >= max_steps:
+                stop_reason = "max_steps"
+                break
+            if patience is not None and step - last_best_step >= patience:
+                stop_reason = "patience"
                 break
+            if check_clock and not step & 255:
+                now = time.perf_counter()
+                if deadline is not None and now >= deadline:
+                    stop_reason = "time_budget"
+                    break
+                if patience_s is not None and now - last_best_t >= patience_s:
+                    stop_reason = "patience"
+                    break
 
+        # una volta per livello di temperatura: azzera la deriva di cost += delta
+        current_cost = ev.resync()
         T *= alpha
 
-    return best, best_cost, history
\ No newline at end of file
+    if best is None:
+        best = _rewind_moves(current, best_log)
+
+    # il best_cost accumulato per delta viene riallineato al valore esatto
+    best_cost = cp.expected_cost(best)
+    history.stop_reason = stop_reason
+    history.move_stats = {}
+    for kind, (proposed, infeasible, accepted) in (("swap", swap_cnt), ("insert", insert_cnt)):
+        if proposed:
+            history.move_stats[kind] = {
+                "proposed": proposed,
+                "infeasible": infeasible,
+                "rejected": proposed - infeasible - accepted,
+                "accepted": accepted,
+                "rejected_rate": (proposed - accepted) / proposed,
+            }
+    return decode(best), best_cost, history
+
+
+def tabu_search(problem, max_iters=500, tenure=None, moves=("swap", "insert"),
+                seed=42, init_order=None, record_every_step=False,
+                time_budget_s=None, patience=None, rng=None):
+    """
+    Tabu search con mosse swap e inserimento.
+    Restituisce: best_order, best_cost, history (come simulated_annealing).
+
+    A ogni iterazione si valutano TUTTE le mosse ammissibili del vicinato
+    (delta incrementali di OrderEvaluator) e si applica la migliore non tabu,
+    anche se peggiorativa. Dopo una mossa diventa tabu, per 'tenure'
+    iterazioni, la coppia di nodi che la annullerebbe:
+      swap u<->w         -> coppia (u, w)
+      inserimento di u   -> (u, nodo che ora occupa la sua vecchia posizione)
+    Aspirazione: una mossa tabu è ammessa se porta a un nuovo best.
+
+    tenure: default max(3, n // 4).
+    rng: come in simulated_annealing (default random.Random(seed)).
+    Criteri di arresto: max_iters, time_budget_s (secondi), patience
+    (iterazioni senza miglioramento del best); se nessuna mossa è
+    ammissibile la ricerca si ferma. Il motivo è in history.stop_reason:
+    "max_iters", "time_budget", "patience" o "no_moves".
+
+    history ha un record per iterazione se record_every_step=True, altrimenti
+    solo l'iniziale + i miglioramenti del best (T non ha significato: NaN).
+    history.move_stats = {tipo: {"evaluated", "applied", "tabu", "aspiration"}}.
+    """
+    cp, decode = as_compiled(problem)
+    for m in moves:
+        if m not in ("swap", "insert"):
+            raise ValueError("moves must contain only 'swap' and/or 'insert'")
+    rng = as_random(rng, seed)
+    t0 = time.perf_counter()
+
+    if init_order is None:
+        start = cp.random_topological_order(rng)
+    else:
+        start = list(init_order) if cp is problem else cp.encode(init_order)
+        if not cp.is_topological_order(start):
+            raise ValueError("init_order non è un ordinamento topologico valido.")
+    ev = OrderEvaluator(cp, start)
+    order = ev.order
+    n = len(order)
+    if tenure is None:
+        tenure = max(3, n // 4)
+
+    best = list(order)
+    best_cost = ev.cost
+    tol = 1e-12 * max(1.0, abs(best_cost))
+
+    history = SearchHistory.for_steps(max_iters) if record_every_step else SearchHistory()
+    record = history.append
+    record(0, math.nan, ev.cost, best_cost, 0.0)
+
+    do_swap = "swap" in moves
+    do_insert = "insert" in moves
+    succ_mask = cp.succ_mask
+    can_swap = cp.can_swap
+    delta_swap = ev.delta_swap
+    insert_deltas = ev.insert_deltas
+
+    stats = {m: {"evaluated": 0, "applied": 0, "tabu": 0, "aspiration": 0} for m in moves}
+    tabu = {}  # (a, b) con a < b -> ultima iterazione in cui la coppia è tabu
+    deadline = None if time_budget_s is None else t0 + time_budget_s
+    last_best_it = 0
+    stop_reason = "max_iters"
+
+    for it in range(1, max_iters + 1):
+        cur = ev.cost
+        chosen = None  # (delta, kind, i, j, key)
+
+        def consider(kind, i, j, delta, a, b):
+            nonlocal chosen
+            st = stats[kind]
+            st["evaluated"] += 1
+            if chosen is not None and delta >= chosen[0]:
+                return
+            key = (a, b) if a < b else (b, a)
+            if tabu.get(key, 0) >= it:
+                if cur + delta >= best_cost - tol:
+                    st["tabu"] += 1
+                    return
+                st["aspiration"] += 1
+            chosen = (delta, kind, i, j, key)
+
+        for i in range(n):
+            u = order[i]
+            if do_swap:
+                for j in range(i + 1, n):
+                    w = order[j]
+                    if (succ_mask[u] >> w) & 1:
+                        break  # w (e ogni nodo oltre) non può scavalcare u
+                    if can_swap(order, i, j):
+                        consider("swap", i, j, delta_swap(i, j), u, w)
+            if do_insert:
+                for j, delta in insert_deltas(i):
+                    consider("insert", i, j, delta, u, order[j])
+
+        if chosen is None:
+            stop_reason = "no_moves"
+            break
+
+        delta, kind, i, j, _ = chosen
+        u = order[i]
+        if kind == "swap":
+            ev.commit_swap(i, j, delta)
+        else:
+            ev.commit_insert(i, j, delta)
+        key = (u, order[i])  # la mossa inversa riporta u davanti/dietro a order[i]
+        tabu[key if key[0] < key[1] else (key[1], key[0])] = it + tenure
+        stats[kind]["applied"] += 1
+        if it % n == 0:
+            ev.resync()
+
+        if ev.cost < best_cost - tol:
+            best = list(order)
+            best_cost = ev.cost
+            last_best_it = it
+            if not record_every_step:
+                record(it, math.nan, ev.cost, best_cost, time.perf_counter() - t0)
+        if record_every_step:
+            record(it, math.nan, ev.cost, best_cost, time.perf_counter() - t0)
+
+        if patience is not None and it - last_best_it >= patience:
+            stop_reason = "patience"
+            break
+        if deadline is not None and time.perf_counter() >= deadline:
+            stop_reason = "time_budget"
+            break
+
+    history.stop_reason = stop_reason
+    history.move_stats = stats
+    return decode(best), cp.expected_cost(best), history
+
+
+def _rewind_moves(order, log):
+    """Copia di 'order' con le mosse (i, j, is_insert) di 'log' annullate in ordine inverso."""
+    snapshot = list(order)
+    for i, j, is_insert in reversed(log):
+        if is_insert:
+            snapshot.insert(i, snapshot.pop(j))
+        else:
+            snapshot[i], snapshot[j] = snapshot[j], snapshot[i]
+    return snapshot
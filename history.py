@@ -0,0 +1,146 @@
+# history.py
+import numpy as np
+
+
+class SearchHistory:
+    """
+    Storia di una ricerca (SA, tabu, ...) in colonne tipizzate preallocate:
+      step (int64), T, current_cost, best_cost, t_s (float64)
+    al posto di una lista di dict (un dict da 5 chiavi per step pesa ~50 volte di più).
+
+    Politiche di campionamento (opzionali, dimensione fissa):
+      every=k    -> tiene solo gli step multipli di k (lo step 0 sempre)
+      bucket=b   -> per ogni blocco di b step tiene i due record con
+                    current_cost minimo e massimo (forma della curva preservata)
+
+    Compatibilità: len(h), h[k] e l'iterazione restituiscono dict
+    {step, T, current_cost, best_cost, t_s} come la vecchia lista.
+    """
+    FIELDS = ("step", "T", "current_cost", "best_cost", "t_s")
+
+    def __init__(self, capacity=64, every=1, bucket=None):
+        if every < 1:
+            raise ValueError("every must be >= 1")
+        if bucket is not None and bucket < 1:
+            raise ValueError("bucket must be >= 1")
+        capacity = max(1, int(capacity))
+        self.every = every
+        self.bucket = bucket
+        self._step = np.empty(capacity, dtype=np.int64)
+        self._vals = np.empty((capacity, 4), dtype=np.float64)
+        self._n = 0
+        # motivo dell'arresto della ricerca (impostato dal solver)
+        self.stop_reason = None
+        # statistiche per tipo di mossa (impostate dal solver)
+        self.move_stats = {}
+        # bucket corrente: (id, record_min, record_max)
+        self._cur_bucket = None
+        self._bmin = None
+        self._bmax = None
+
+    @classmethod
+    def for_steps(cls, max_steps, every=1, bucket=None):
+        """Preallocazione dimensionata per max_steps passi con la politica data."""
+        if bucket is not None:
+            cap = 2 * (max_steps // bucket + 2)
+        else:
+            cap = max_steps // every + 2
+        return cls(capacity=cap, every=every, bucket=bucket)
+
+    def _push(self, step, T, current_cost, best_cost, t_s):
+        n = self._n
+        if n == len(self._step):
+            self._step = np.resize(self._step, 2 * n)
+            self._vals = np.resize(self._vals, (2 * n, 4))
+        self._step[n] = step
+        self._vals[n] = (T, current_cost, best_cost, t_s)
+        self._n = n + 1
+
+    def append(self, step, T, current_cost, best_cost, t_s):
+        """Registra uno step (se la politica di campionamento lo tiene)."""
+        if self.bucket is None:
+            if step % self.every == 0 or self._n == 0:
+                self._push(step, T, current_cost, best_cost, t_s)
+            return
+
+        rec = (step, T, current_cost, best_cost, t_s)
+        b = step // self.bucket
+        if b != self._cur_bucket:
+            self._flush_bucket()
+            self._cur_bucket = b
+            self._bmin = self._bmax = rec
+        elif current_cost < self._bmin[2]:
+            self._bmin = rec
+        elif current_cost > self._bmax[2]:
+            self._bmax = rec
+
+    def _flush_bucket(self):
+        if self._cur_bucket is None:
+            return
+        lo, hi = self._bmin, self._bmax
+        for rec in sorted({lo, hi}, key=lambda r: r[0]):
+            self._push(*rec)
+        self._cur_bucket = None
+
+    # ---- accesso ----
+
+    def _filled(self):
+        self._flush_bucket()
+        return self._step[:self._n], self._vals[:self._n]
+
+    @property
+    def step(self):
+        return self._filled()[0]
+
+    @property
+    def T(self):
+        return self._filled()[1][:, 0]
+
+    @property
+    def current_cost(self):
+        return self._filled()[1][:, 1]
+
+    @property
+    def best_cost(self):
+        return self._filled()[1][:, 2]
+
+    @property
+    def t_s(self):
+        return self._filled()[1][:, 3]
+
+    def to_numpy(self):
+        """Array strutturato con i campi step, T, current_cost, best_cost, t_s."""
+        steps, vals = self._filled()
+        out = np.empty(len(steps), dtype=[("step", np.int64)] +
+                       [(f, np.float64) for f in self.FIELDS[1:]])
+        out["step"] = steps
+        for k, f in enumerate(self.FIELDS[1:]):
+            out[f] = vals[:, k]
+        return out
+
+    def to_dataframe(self):
+        """DataFrame pandas con una colonna per campo."""
+        import pandas as pd
+        steps, vals = self._filled()
+        data = {"step": steps}
+        for k, f in enumerate(self.FIELDS[1:]):
+            data[f] = vals[:, k]
+        return pd.DataFrame(data)
+
+    def __len__(self):
+        self._flush_bucket()
+        return self._n
+
+    def __getitem__(self, k):
+        steps, vals = self._filled()
+        if k < 0:
+            k += self._n
+        if not 0 <= k < self._n:
+            raise IndexError("SearchHistory index out of range")
+        T, cur, best, t_s = vals[k].tolist()
+        return {"step": int(steps[k]), "T": T, "current_cost": cur,
+                "best_cost": best, "t_s": t_s}
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
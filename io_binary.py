@@ -0,0 +1,146 @@
+# io_binary.py
+# Formato binario delle istanze (.stpb) e convertitore di cartelle JSON.
+# es run: >python io_binary.py testN20 --out testN20_bin
+import os
+import glob
+import json
+import struct
+import argparse
+
+import numpy as np
+
+from problem import CompiledProblem, SequentialTestingProblem, as_compiled
+
+
+EXT = ".stpb"
+MAGIC = b"STPB"
+FORMAT_VERSION = 1
+# magic, versione, n, m, lunghezza della tabella id; padding a 32 byte
+# così gli array float64 che seguono sono allineati (np.memmap-abili)
+_HEADER = struct.Struct("<4sIIII12x")
+
+
+def save_problem_binary(problem, path):
+    """
+    Salva un'istanza in un unico file binario little-endian:
+      header   32 byte         MAGIC, versione, n, m, len(ids)
+      cost, p  float64 [n]     costi e probabilità di successo
+      indptr   int32 [n+1]     adiacenza CSR dei successori:
+      indices  int32 [m]       succ(u) = indices[indptr[u]:indptr[u+1]]
+      topo     int32 [n]       ordinamento topologico precalcolato
+      ids      JSON utf-8      tabella degli id originali (tipi preservati)
+    Un .npz con gli stessi array costa più del JSON da caricare su istanze
+    piccole (zip + parsing dell'header di ogni array): qui basta una lettura
+    e np.frombuffer sugli offset. Accetta SequentialTestingProblem o CompiledProblem.
+    """
+    cp, _ = as_compiled(problem)
+    ids = json.dumps(cp.ids).encode("utf-8")
+    indptr = np.zeros(cp.n + 1, dtype=np.int32)
+    np.cumsum([len(s) for s in cp.succs], out=indptr[1:])
+    indices = np.fromiter((v for s in cp.succs for v in s), dtype=np.int32, count=len(cp.edges))
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, cp.n, len(indices), len(ids)))
+        f.write(np.asarray(cp.cost, dtype="<f8").tobytes())
+        f.write(np.asarray(cp.p, dtype="<f8").tobytes())
+        f.write(indptr.astype("<i4").tobytes())
+        f.write(indices.astype("<i4").tobytes())
+        f.write(np.asarray(cp.topo, dtype="<i4").tobytes())
+        f.write(ids)
+
+
+def load_compiled_binary(path):
+    """
+    Carica un .stpb direttamente in un CompiledProblem, senza networkx.
+    La validazione è vettorizzata: dimensioni coerenti, p in [0,1] e cost
+    finito e > 0 (stessi messaggi di load_graph), indici in range e topo
+    permutazione dei nodi che rispetta tutti gli archi (quindi DAG).
+    """
+    with open(path, "rb") as f:
+        buf = f.read()
+    if len(buf) < _HEADER.size:
+        raise ValueError(f"{path}: file troppo corto.")
+    magic, version, n, m, ids_len = _HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise ValueError(f"{path}: non è un file {EXT}.")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"{path}: versione del formato {version} non supportata "
+                         f"(attesa {FORMAT_VERSION}).")
+    if len(buf) != _HEADER.size + 16 * n + 4 * (2 * n + 1 + m) + ids_len:
+        raise ValueError(f"{path}: dimensione del file incoerente con l'header.")
+
+    off = _HEADER.size
+    cost = np.frombuffer(buf, dtype="<f8", count=n, offset=off)
+    off += 8 * n
+    p = np.frombuffer(buf, dtype="<f8", count=n, offset=off)
+    off += 8 * n
+    indptr = np.frombuffer(buf, dtype="<i4", count=n + 1, offset=off)
+    off += 4 * (n + 1)
+    indices = np.frombuffer(buf, dtype="<i4", count=m, offset=off)
+    off += 4 * m
+    topo = np.frombuffer(buf, dtype="<i4", count=n, offset=off)
+    off += 4 * n
+    ids = json.loads(buf[off:].decode("utf-8"))
+
+    if len(ids) != n or indptr[0] != 0 or indptr[-1] != m or (np.diff(indptr) < 0).any():
+        raise ValueError(f"{path}: tabella id o indptr incoerenti.")
+    bad = np.flatnonzero(~((p >= 0.0) & (p <= 1.0)))
+    if len(bad):
+        k = bad[0]
+        raise ValueError(f"{path}: Nodo {ids[k]}: probabilità p={p[k]} fuori da [0,1].")
+    bad = np.flatnonzero(~(np.isfinite(cost) & (cost > 0)))
+    if len(bad):
+        k = bad[0]
+        raise ValueError(f"{path}: Nodo {ids[k]}: costo={cost[k]} deve essere finito e > 0.")
+
+    if m and (indices.min() < 0 or indices.max() >= n):
+        raise ValueError(f"{path}: indice di nodo fuori range negli archi.")
+    if n and (topo.min() < 0 or topo.max() >= n):
+        raise ValueError(f"{path}: indice di nodo fuori range in 'topo'.")
+
+    src = np.repeat(np.arange(n, dtype=np.int32), np.diff(indptr))
+    pos = np.full(n, -1, dtype=np.int64)
+    pos[topo] = np.arange(n)
+    if (pos < 0).any() or (pos[src] >= pos[indices]).any():
+        raise ValueError(f"{path}: 'topo' non è un ordinamento topologico valido.")
+
+    edges = list(zip(src.tolist(), indices.tolist()))
+    return CompiledProblem(ids, cost.tolist(), p.tolist(), edges, topo=topo.tolist())
+
+
+def load_problem_binary(path):
+    """Come load_compiled_binary, ma restituisce un SequentialTestingProblem (G creato solo se serve)."""
+    return SequentialTestingProblem.from_compiled(load_compiled_binary(path))
+
+
+def convert_folder(folder, out=None, overwrite=False):
+    """
+    Converte tutti i .json di 'folder' in .stpb (stesso nome) nella cartella
+    'out' (default: la stessa). Restituisce il numero di file convertiti.
+    """
+    from load_graph import load_graph_from_json
+
+    out = out or folder
+    os.makedirs(out, exist_ok=True)
+    converted = 0
+    for path in sorted(glob.glob(os.path.join(folder, "*.json"))):
+        dst = os.path.join(out, os.path.splitext(os.path.basename(path))[0] + EXT)
+        if os.path.exists(dst) and not overwrite:
+            continue
+        save_problem_binary(load_graph_from_json(path), dst)
+        converted += 1
+    return converted
+
+
+def main():
+    ap = argparse.ArgumentParser(description=f"Converte una cartella di istanze JSON in {EXT}")
+    ap.add_argument("folder", help="Cartella con i .json (es: testN20)")
+    ap.add_argument("--out", default=None, help="Cartella di destinazione (default: la stessa)")
+    ap.add_argument("--overwrite", action="store_true", help=f"Riscrive i {EXT} già presenti")
+    args = ap.parse_args()
+
+    converted = convert_folder(args.folder, out=args.out, overwrite=args.overwrite)
+    print(f"[{EXT}] {converted} file convertiti in '{args.out or args.folder}'")
+
+
+if __name__ == "__main__":
+    main()
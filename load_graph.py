@@ -1,18 +1,49 @@
 # load_graph.py
 import json
-import networkx as nx
-from problem import SequentialTestingProblem, TestData
+import math
+from problem import CompiledProblem, SequentialTestingProblem
 
 
-class GraphValidationError(Exception):
+class GraphValidationError(ValueError):
     """Errore specifico di validazione del grafo."""
     pass
 
 
-def validate_graph_data(raw: dict):
+def _find_cycle(ids, succs, indeg):
+    """
+    Un ciclo tra i nodi rimasti con in-degree > 0 dopo Kahn: ognuno ha un
+    predecessore anch'esso rimasto, quindi risalendo i predecessori si
+    rivisita prima o poi un nodo. Restituisce la lista di id [a, b, ..., a].
     """
-    Valida la struttura del file JSON e restituisce (G, test_data).
-    Lancia GraphValidationError con messaggio chiaro in caso di problemi.
+    n = len(ids)
+    pred = [-1] * n
+    for u in range(n):
+        if indeg[u] > 0:
+            for v in succs[u]:
+                if indeg[v] > 0:
+                    pred[v] = u
+    v = next(u for u in range(n) if indeg[u] > 0)
+    seen = {}
+    path = []
+    while v not in seen:
+        seen[v] = len(path)
+        path.append(v)
+        v = pred[v]
+    cycle = path[seen[v]:][::-1]
+    return [ids[u] for u in cycle + cycle[:1]]
+
+
+def compile_graph_data(raw) -> CompiledProblem:
+    """
+    Valida la struttura del JSON e compila il problema in un solo passaggio,
+    senza networkx. Lancia GraphValidationError con messaggio chiaro in caso
+    di problemi (anche per i cicli, indicandone uno).
+
+    Nodi: campi id/p/cost, id stringa o intero non duplicato, p in [0,1],
+    cost finito e > 0. Archi: coppie [u, v] di nodi esistenti, niente
+    self-loop (gli archi ripetuti contano una volta). Il controllo di
+    aciclicità è un Kahn su array (FIFO, in ordine di indice) che produce
+    anche l'ordinamento topologico e gli in-degree del CompiledProblem.
     """
     if not isinstance(raw, dict):
         raise GraphValidationError("Il file JSON deve contenere un oggetto ({}).")
@@ -28,9 +59,10 @@ def validate_graph_data(raw: dict):
     if not isinstance(edges_raw, list):
         raise GraphValidationError("'edges' deve essere una lista di coppie [u, v].")
 
-    G = nx.DiGraph()
-    test_data = {}
-    node_ids = set()
+    ids = []
+    index = {}
+    cost = []
+    p = []
 
     # --- Valida nodi ---
     for i, node in enumerate(nodes_raw):
@@ -42,47 +74,92 @@ def validate_graph_data(raw: dict):
                 raise GraphValidationError(f"Nodo {i}: manca il campo '{key}'.")
 
         node_id = node["id"]
-        if node_id in node_ids:
+        if not isinstance(node_id, (str, int)) or isinstance(node_id, bool):
+            raise GraphValidationError(f"Nodo {i}: 'id' deve essere una stringa o un intero.")
+        if node_id in index:
             raise GraphValidationError(f"ID nodo duplicato: {node_id}")
-        node_ids.add(node_id)
 
         try:
-            p = float(node["p"])
+            pv = float(node["p"])
             c = float(node["cost"])
-        except ValueError:
+        except (TypeError, ValueError):
             raise GraphValidationError(f"Nodo {node_id}: 'p' e 'cost' devono essere numeri.")
 
-        if not (0.0 <= p <= 1.0):
-            raise GraphValidationError(f"Nodo {node_id}: probabilità p={p} fuori da [0,1].")
-        if c <= 0:
-            raise GraphValidationError(f"Nodo {node_id}: costo={c} deve essere > 0.")
+        if not (0.0 <= pv <= 1.0):
+            raise GraphValidationError(f"Nodo {node_id}: probabilità p={pv} fuori da [0,1].")
+        if not (c > 0 and math.isfinite(c)):
+            raise GraphValidationError(f"Nodo {node_id}: costo={c} deve essere finito e > 0.")
 
-        G.add_node(node_id)
-        test_data[node_id] = TestData(p_success=p, cost=c)
+        index[node_id] = len(ids)
+        ids.append(node_id)
+        cost.append(c)
+        p.append(pv)
 
-    if not node_ids:
+    n = len(ids)
+    if not n:
         raise GraphValidationError("Il grafo non contiene nodi.")
 
     # --- Valida archi ---
+    edges = []
+    seen = set()
+    succs = [[] for _ in range(n)]
+    indeg = [0] * n
     for k, edge in enumerate(edges_raw):
         if (not isinstance(edge, list) and not isinstance(edge, tuple)) or len(edge) != 2:
             raise GraphValidationError(f"Arco in posizione {k} non è una coppia [u, v].")
 
         u, v = edge
-        if u not in node_ids:
+        try:
+            iu = index[u]
+        except (KeyError, TypeError):
             raise GraphValidationError(f"Arco {k}: nodo sorgente '{u}' non esiste.")
-        if v not in node_ids:
+        try:
+            iv = index[v]
+        except (KeyError, TypeError):
             raise GraphValidationError(f"Arco {k}: nodo destinazione '{v}' non esiste.")
-        if u == v:
+        if iu == iv:
             raise GraphValidationError(f"Arco {k}: self-loop ({u} -> {v}) non ammesso.")
 
-        G.add_edge(u, v)
+        if (iu, iv) in seen:
+            continue
+        seen.add((iu, iv))
+        edges.append((iu, iv))
+        succs[iu].append(iv)
+        indeg[iv] += 1
+
+    # --- Deve essere un DAG: Kahn su array ---
+    rem = list(indeg)
+    topo = [u for u in range(n) if rem[u] == 0]
+    head = 0
+    while head < len(topo):
+        u = topo[head]
+        head += 1
+        for v in succs[u]:
+            rem[v] -= 1
+            if rem[v] == 0:
+                topo.append(v)
+    if len(topo) < n:
+        cycle = _find_cycle(ids, succs, rem)
+        raise GraphValidationError(
+            "Il grafo contiene cicli: non è un DAG (es. "
+            + " -> ".join(map(str, cycle)) + ")."
+        )
+
+    return CompiledProblem(ids, cost, p, edges, topo=topo, indeg=indeg)
+
+
+def load_problem_from_data(raw) -> SequentialTestingProblem:
+    """Valida un JSON già decodificato (dict) e restituisce un SequentialTestingProblem."""
+    return SequentialTestingProblem.from_compiled(compile_graph_data(raw))
 
-    # --- Deve essere un DAG ---
-    if not nx.is_directed_acyclic_graph(G):
-        raise GraphValidationError("Il grafo contiene cicli: non è un DAG.")
 
-    return G, test_data
+def validate_graph_data(raw: dict):
+    """
+    Valida la struttura del file JSON e restituisce (G, test_data)
+    (vedi compile_graph_data: G networkx costruito solo qui, su richiesta).
+    """
+    problem = load_problem_from_data(raw)
+    return problem.G, problem.test_data
 
 
 def load_graph_from_json(path: str) -> SequentialTestingProblem:
@@ -92,5 +169,4 @@ def load_graph_from_json(path: str) -> SequentialTestingProblem:
     with open(path, "r", encoding="utf-8") as f:
         raw = json.load(f)
 
-    G, test_data = validate_graph_data(raw)
-    return SequentialTestingProblem(G, test_data)
+    return load_problem_from_data(raw)
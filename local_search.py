@@ -0,0 +1,204 @@
+# local_search.py
+import time
+
+from problem import as_compiled
+from evaluator import OrderEvaluator
+
+
+MOVES = ("adjacent", "insert", "block")
+
+
+def _adjacent_delta(c, p, u, w, r):
+    """Variazione del costo scambiando u,w adiacenti (u prima di w, reach r davanti a u)."""
+    return r * (c[w] * (1.0 - p[u]) - c[u] * (1.0 - p[w]))
+
+
+def _block_deltas(cp, order, reach, i, L):
+    """
+    Spostamenti ammissibili del blocco order[i:i+L] (tenuto intatto):
+    genera (j, delta) con j = nuova posizione d'inizio del blocco.
+
+    Il blocco si comporta come un job composito (C, P) relativo al reach
+    davanti a sé: scavalcare un nodo w costa r * (c_w (1-P) - C (1-p_w)),
+    quindi tutta la scansione in una direzione è O(distanza).
+    Ci si ferma al primo nodo che è successore (a destra) o predecessore
+    (a sinistra) di un nodo del blocco.
+    """
+    c = cp.cost
+    p = cp.p
+    pred_mask = cp.pred_mask
+    succ_mask = cp.succ_mask
+    n = len(order)
+
+    C = 0.0
+    P = 1.0
+    bmask = 0
+    for t in range(i, i + L):
+        v = order[t]
+        C += c[v] * P
+        P *= p[v]
+        bmask |= 1 << v
+    q = 1.0 - P
+
+    # verso destra: il blocco scavalca order[i+L], order[i+L+1], ...
+    d = 0.0
+    r = reach[i]
+    for k in range(i + L, n):
+        w = order[k]
+        if pred_mask[w] & bmask:
+            break
+        d += r * (c[w] * q - C * (1.0 - p[w]))
+        r *= p[w]
+        yield k - L + 1, d
+
+    # verso sinistra: il blocco scavalca order[i-1], order[i-2], ...
+    d = 0.0
+    for k in range(i - 1, -1, -1):
+        w = order[k]
+        if succ_mask[w] & bmask:
+            break
+        d += reach[k] * (C * (1.0 - p[w]) - c[w] * q)
+        yield k, d
+
+
+def _move_block(order, i, L, j):
+    """Sposta in place il blocco order[i:i+L] perché inizi in posizione j."""
+    block = order[i:i + L]
+    del order[i:i + L]
+    order[j:j] = block
+
+
+def local_search(problem, order, moves=MOVES, strategy="first", max_block=3,
+                 max_iters=None):
+    """
+    Ricerca locale deterministica a partire da un ordine topologico.
+
+    moves (vicinati, esplorati in questo ordine):
+      "adjacent" -> scambio di due test adiacenti non collegati da un arco:
+                    delta in forma chiusa r * (c_w (1-p_u) - c_u (1-p_w)),
+                    una passata completa costa O(n)
+      "insert"   -> un nodo spostato in un'altra posizione ammissibile
+      "block"    -> blocco di 2..max_block nodi consecutivi spostato intatto
+                    (Or-opt)
+    strategy:
+      "first" -> applica il primo miglioramento trovato; quando un vicinato
+                 migliora si riparte dal primo (variable neighbourhood descent)
+      "best"  -> a ogni iterazione applica la mossa migliore fra tutti i vicinati
+    max_iters: limite al numero di mosse applicate (None = fino all'ottimo locale).
+
+    Restituisce: order, cost, stats
+      stats["moves"]     = mosse applicate per vicinato
+      stats["evaluated"] = mosse valutate
+      stats["time_s"]    = tempo di esecuzione
+    """
+    cp, decode = as_compiled(problem)
+    if strategy not in ("first", "best"):
+        raise ValueError("strategy must be 'first' or 'best'")
+    for m in moves:
+        if m not in MOVES:
+            raise ValueError(f"unknown move '{m}' (expected one of {MOVES})")
+
+    start = list(order) if cp is problem else cp.encode(order)
+    if not cp.is_topological_order(start):
+        raise ValueError("order non è un ordinamento topologico valido.")
+
+    t0 = time.perf_counter()
+    ev = OrderEvaluator(cp, start)
+    order = ev.order
+    reach = ev.reach
+    c = cp.cost
+    p = cp.p
+    succ_mask = cp.succ_mask
+    n = cp.n
+
+    stats = {"moves": {m: 0 for m in moves}, "evaluated": 0, "time_s": 0.0}
+    applied = 0
+
+    def budget_left():
+        return max_iters is None or applied < max_iters
+
+    def tol():
+        return 1e-12 * max(1.0, abs(ev.cost))
+
+    def block_lengths(kind):
+        return (1,) if kind == "insert" else range(2, max_block + 1)
+
+    def adjacent_pass():
+        """Una passata di scambi adiacenti (first improvement); True se migliora."""
+        nonlocal applied
+        improved = False
+        for k in range(n - 1):
+            if not budget_left():
+                break
+            u = order[k]
+            w = order[k + 1]
+            stats["evaluated"] += 1
+            if (succ_mask[u] >> w) & 1:
+                continue
+            d = _adjacent_delta(c, p, u, w, reach[k])
+            if d < -tol():
+                order[k], order[k + 1] = w, u
+                reach[k + 1] = reach[k] * p[w]
+                ev.cost += d
+                stats["moves"]["adjacent"] += 1
+                applied += 1
+                improved = True
+        return improved
+
+    def block_pass(kind):
+        """Una passata di spostamenti insert/block (first improvement); True se migliora."""
+        nonlocal applied
+        improved = False
+        for L in block_lengths(kind):
+            for i in range(n - L + 1):
+                if not budget_left():
+                    return improved
+                for j, d in _block_deltas(cp, order, reach, i, L):
+                    stats["evaluated"] += 1
+                    if d < -tol():
+                        _move_block(order, i, L, j)
+                        ev.resync()
+                        stats["moves"][kind] += 1
+                        applied += 1
+                        improved = True
+                        break
+        return improved
+
+    if strategy == "first":
+        k = 0
+        while k < len(moves) and budget_left():
+            kind = moves[k]
+            improved = adjacent_pass() if kind == "adjacent" else block_pass(kind)
+            k = 0 if improved else k + 1
+    else:
+        while budget_left():
+            best = None  # (delta, kind, i, L, j)
+            for kind in moves:
+                if kind == "adjacent":
+                    for k in range(n - 1):
+                        u = order[k]
+                        w = order[k + 1]
+                        stats["evaluated"] += 1
+                        if (succ_mask[u] >> w) & 1:
+                            continue
+                        d = _adjacent_delta(c, p, u, w, reach[k])
+                        if best is None or d < best[0]:
+                            best = (d, kind, k, 1, k + 1)
+                    continue
+                for L in block_lengths(kind):
+                    for i in range(n - L + 1):
+                        for j, d in _block_deltas(cp, order, reach, i, L):
+                            stats["evaluated"] += 1
+                            if best is None or d < best[0]:
+                                best = (d, kind, i, L, j)
+            if best is None or best[0] >= -tol():
+                break
+            _, kind, i, L, j = best
+            _move_block(order, i, L, j)
+            ev.resync()
+            stats["moves"][kind] += 1
+            applied += 1
+
+    cost = ev.resync()
+    stats["time_s"] = time.perf_counter() - t0
+    return decode(order), cost, stats
@@ -1,6 +1,7 @@
 # problem.py
-import random
-import networkx as nx
+import json
+import hashlib
+from collections import deque
 from dataclasses import dataclass
 
 
@@ -11,6 +12,226 @@ class TestData:
     cost: float       # Costo del test
 
 
+class CompiledProblem:
+    """
+    Forma "compilata" del problema, costruita una sola volta al caricamento:
+    - nodi mappati su indici 0..n-1 (ids[i] = id originale)
+    - costi e probabilità in liste piatte (cost[i], p[i])
+    - liste di predecessori/successori per indice
+    - bitmask di precedenza: bit j di pred_mask[i] acceso se esiste l'arco j->i
+      (succ_mask analogo per i successori); costano O(n^2) bit, quindi sono
+      costruite solo al primo accesso (greedy e Kahn non le usano)
+    - in-degree (indeg[i] = numero di predecessori) e un ordinamento
+      topologico (topo), di solito già prodotti dal loader (load_graph.py)
+
+    Espone le stesse operazioni di SequentialTestingProblem, ma su ordini
+    di indici: le euristiche e il solver esatto lavorano qui e traducono
+    gli ordini negli id originali solo alla fine.
+    """
+    def __init__(self, ids, cost, p, edges, topo=None, indeg=None):
+        self.ids = list(ids)
+        self.index = {v: i for i, v in enumerate(self.ids)}
+        self.n = len(self.ids)
+        self.nodes = list(range(self.n))
+
+        self.cost = [float(c) for c in cost]
+        self.p = [float(x) for x in p]
+
+        self.edges = [(int(u), int(v)) for u, v in edges]
+        self.succs = [[] for _ in range(self.n)]
+        self.preds = [[] for _ in range(self.n)]
+        for u, v in self.edges:
+            self.succs[u].append(v)
+            self.preds[v].append(u)
+        self._pred_mask = None
+        self._succ_mask = None
+
+        self.indeg = list(indeg) if indeg is not None else [len(pr) for pr in self.preds]
+        self.topo = list(topo) if topo is not None else self._kahn_order()
+
+    @classmethod
+    def from_graph(cls, G, test_data: dict):
+        """Compila un DAG networkx + test_data (dict id -> TestData)."""
+        import networkx as nx
+        ids = list(G.nodes())
+        index = {v: i for i, v in enumerate(ids)}
+        cost = [test_data[v].cost for v in ids]
+        p = [test_data[v].p_success for v in ids]
+        edges = [(index[u], index[v]) for u, v in G.edges()]
+        topo = [index[v] for v in nx.topological_sort(G)]
+        return cls(ids, cost, p, edges, topo=topo)
+
+    @property
+    def compiled(self):
+        return self
+
+    def _build_masks(self):
+        pred_mask = [0] * self.n
+        succ_mask = [0] * self.n
+        for u, v in self.edges:
+            succ_mask[u] |= 1 << v
+            pred_mask[v] |= 1 << u
+        self._pred_mask = pred_mask
+        self._succ_mask = succ_mask
+
+    @property
+    def pred_mask(self):
+        if self._pred_mask is None:
+            self._build_masks()
+        return self._pred_mask
+
+    @property
+    def succ_mask(self):
+        if self._succ_mask is None:
+            self._build_masks()
+        return self._succ_mask
+
+    def _kahn_order(self):
+        """Ordinamento topologico deterministico (Kahn, FIFO)."""
+        indeg = list(self.indeg)
+        queue = deque(u for u in range(self.n) if indeg[u] == 0)
+        order = []
+        while queue:
+            u = queue.popleft()
+            order.append(u)
+            for v in self.succs[u]:
+                indeg[v] -= 1
+                if indeg[v] == 0:
+                    queue.append(v)
+        return order
+
+    def content_hash(self):
+        """
+        Impronta sha256 del contenuto dell'istanza (id, costi, probabilità,
+        archi), indipendente dall'ordine di nodi e archi: chiave per le cache.
+        """
+        ids = [str(v) for v in self.ids]
+        nodes = sorted((ids[i], repr(self.cost[i]), repr(self.p[i])) for i in self.nodes)
+        edges = sorted((ids[u], ids[v]) for u, v in self.edges)
+        h = hashlib.sha256()
+        h.update(json.dumps([nodes, edges], separators=(",", ":")).encode("utf-8"))
+        return h.hexdigest()
+
+    def encode(self, order):
+        """Ordine di id originali -> ordine di indici."""
+        index = self.index
+        return [index[v] for v in order]
+
+    def decode(self, order):
+        """Ordine di indici -> ordine di id originali."""
+        ids = self.ids
+        return [ids[i] for i in order]
+
+    def is_topological_order(self, order):
+        """
+        Controlla se 'order' (indici) rispetta tutte le precedenze.
+        Un ordine che non è una permutazione dei nodi (nodo mancante o ripetuto)
+        solleva ValueError invece di restituire un booleano.
+        """
+        if len(order) != self.n:
+            raise ValueError(f"L'ordine ha {len(order)} nodi, attesi {self.n}.")
+        pos = [-1] * self.n
+        for k, v in enumerate(order):
+            if pos[v] != -1:
+                raise ValueError(f"Nodo ripetuto nell'ordine: {self.ids[v]}")
+            pos[v] = k
+        for u, v in self.edges:
+            if pos[u] >= pos[v]:
+                return False
+        return True
+
+    def random_topological_order(self, rng=None):
+        """
+        Genera un ordinamento topologico casuale (valido), su indici:
+        Kahn con scelta casuale tra i disponibili, O(n + m)
+        (vedi sampling.py per i campionatori uniformi).
+        rng: random.Random o numpy.Generator (default: nuovo generatore;
+        lo stato globale del modulo random non viene mai usato).
+        """
+        from sampling import random_kahn_order
+        return random_kahn_order(self, rng)
+
+    def expected_cost(self, order):
+        """E[C] = sum_k c_k * prod_{j<k} p_j, con 'order' di indici."""
+        cost = self.cost
+        p = self.p
+        exp_cost = 0.0
+        prob_reach = 1.0
+        for v in order:
+            exp_cost += cost[v] * prob_reach
+            prob_reach *= p[v]
+        return exp_cost
+
+    def can_swap(self, order, i, j):
+        """
+        True se scambiare le posizioni i,j di un ordine topologico (di indici)
+        lo lascia topologico. Con i<j, u=order[i], w=order[j], lo swap è
+        invalido solo se esiste un arco u->x con x in posizioni i+1..j oppure
+        x->w con x in posizioni i..j-1: basta guardare la finestra e le
+        bitmask di u e w, senza copie né mappa delle posizioni. O(j - i).
+        """
+        if i == j:
+            return True
+        if i > j:
+            i, j = j, i
+        u = order[i]
+        w = order[j]
+        succ_mask = self.succ_mask
+        if (succ_mask[u] >> w) & 1:
+            return False
+        mask = succ_mask[u] | self.pred_mask[w]
+        if mask:
+            for k in range(i + 1, j):
+                if (mask >> order[k]) & 1:
+                    return False
+        return True
+
+    def insertion_window(self, order, i):
+        """
+        Finestra [lo, hi] delle posizioni in cui il nodo in posizione i può
+        essere reinserito (mossa di inserimento) mantenendo l'ordine
+        topologico: lo = ultima posizione di un predecessore + 1,
+        hi = prima posizione di un successore - 1. O(hi - lo).
+        """
+        u = order[i]
+        pm = self.pred_mask[u]
+        sm = self.succ_mask[u]
+        lo = i
+        if pm:
+            while lo > 0 and not (pm >> order[lo - 1]) & 1:
+                lo -= 1
+        else:
+            lo = 0
+        hi = i
+        last = len(order) - 1
+        if sm:
+            while hi < last and not (sm >> order[hi + 1]) & 1:
+                hi += 1
+        else:
+            hi = last
+        return lo, hi
+
+    def try_swap(self, order, i, j):
+        """Come SequentialTestingProblem.try_swap, ma su ordini di indici."""
+        if not self.can_swap(order, i, j):
+            return None
+        new_order = list(order)
+        new_order[i], new_order[j] = new_order[j], new_order[i]
+        return new_order
+
+
+def as_compiled(problem):
+    """
+    Restituisce (compiled, decode): la forma compilata di 'problem' e la funzione
+    che riporta un ordine di indici agli id originali.
+    Se 'problem' è già un CompiledProblem, decode lascia gli indici come sono.
+    """
+    cp = problem.compiled
+    if cp is problem:
+        return cp, list
+    return cp, cp.decode
+
+
 class SequentialTestingProblem:
     """
     Incapsula:
@@ -18,30 +239,52 @@ class SequentialTestingProblem:
     - p_i e c_i su ogni nodo
     - funzione costo atteso di un ordine
     - mosse che rispettano il DAG
+
+    La forma compilata (self.compiled) viene costruita una volta sola qui:
+    tutti i metodi delegano ad essa traducendo gli id al bordo.
+    networkx serve solo per G (DiGraph), costruito al primo accesso quando
+    il problema viene da un loader (from_compiled).
     """
-    def __init__(self, G: nx.DiGraph, test_data: dict):
-        self.G = G
+    def __init__(self, G, test_data: dict):
+        self._G = G
         self.test_data = test_data
         self.nodes = list(G.nodes())
+        self.compiled = CompiledProblem.from_graph(G, test_data)
+
+    @classmethod
+    def from_compiled(cls, cp: CompiledProblem):
+        """
+        Problema costruito direttamente da una forma compilata (es. file .npz),
+        senza networkx: il DiGraph G viene creato solo al primo accesso.
+        """
+        self = cls.__new__(cls)
+        self._G = None
+        self.test_data = {v: TestData(p_success=p, cost=c)
+                          for v, c, p in zip(cp.ids, cp.cost, cp.p)}
+        self.nodes = list(cp.ids)
+        self.compiled = cp
+        return self
+
+    @property
+    def G(self):
+        if self._G is None:
+            import networkx as nx
+            cp = self.compiled
+            G = nx.DiGraph()
+            G.add_nodes_from(cp.ids)
+            G.add_edges_from(cp.decode(e) for e in cp.edges)
+            self._G = G
+        return self._G
 
     def is_topological_order(self, order):
         """Controlla se 'order' rispetta tutte le precedenze (archi u->v)."""
-        pos = {v: i for i, v in enumerate(order)}
-        for u, v in self.G.edges():
-            if pos[u] >= pos[v]:
-                return False
-        return True
+        cp = self.compiled
+        return cp.is_topological_order(cp.encode(order))
 
-    def random_topological_order(self):
+    def random_topological_order(self, rng=None):
         """Genera un ordinamento topologico casuale (valido)."""
-        # networkx genera un topological order; poi facciamo qualche swap valido
-        order = list(nx.topological_sort(self.G))
-        for _ in range(2 * len(order)):
-            i, j = random.sample(range(len(order)), 2)
-            new_order = self.try_swap(order, i, j)
-            if new_order is not None:
-                order = new_order
-        return order
+        cp = self.compiled
+        return cp.decode(cp.random_topological_order(rng))
 
     def expected_cost(self, order):
         """
@@ -51,12 +294,31 @@ class SequentialTestingProblem:
 
         E[C] = sum_k c_k * prod_{j<k} p_j
         """
-        exp_cost = 0.0
-        prob_reach = 1.0
-        for v in order:
-            exp_cost += self.test_data[v].cost * prob_reach
-            prob_reach *= self.test_data[v].p_success
-        return exp_cost
+        cp = self.compiled
+        return cp.expected_cost(cp.encode(order))
+
+    def can_swap(self, order, i, j):
+        """
+        True se lo swap delle posizioni i,j mantiene 'order' topologico.
+        Controllo locale (vedi CompiledProblem.can_swap): guarda solo la
+        finestra tra i e j e le adiacenze dei due nodi scambiati.
+        """
+        if i == j:
+            return True
+        if i > j:
+            i, j = j, i
+        cp = self.compiled
+        index = cp.index
+        u = index[order[i]]
+        w = index[order[j]]
+        if (cp.succ_mask[u] >> w) & 1:
+            return False
+        mask = cp.succ_mask[u] | cp.pred_mask[w]
+        if mask:
+            for k in range(i + 1, j):
+                if (mask >> index[order[k]]) & 1:
+                    return False
+        return True
 
     def try_swap(self, order, i, j):
         """
@@ -64,12 +326,8 @@ class SequentialTestingProblem:
         Se l'ordine rimane topologico -> restituisce il nuovo ordine,
         altrimenti -> None.
         """
-        if i == j:
-            return list(order)
-
+        if not self.can_swap(order, i, j):
+            return None
         new_order = list(order)
         new_order[i], new_order[j] = new_order[j], new_order[i]
-
-        if self.is_topological_order(new_order):
-            return new_order
-        return None
+        return new_order
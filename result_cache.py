@@ -0,0 +1,124 @@
+# result_cache.py
+import json
+import time
+import sqlite3
+import hashlib
+
+from problem import as_compiled
+
+
+DEFAULT_PATH = ".results_cache.sqlite"
+# versione dello schema e dei solver: fa parte della chiave, va incrementata
+# quando cambia il risultato di un solver (le voci vecchie non vengono più lette)
+CACHE_VERSION = 2
+
+
+class ResultCache:
+    """
+    Cache persistente dei risultati dei solver in un file SQLite.
+
+    Chiave = sha256(CACHE_VERSION + impronta del contenuto dell'istanza +
+    ordine di nodi e archi + nome del solver + parametri in JSON canonico).
+    L'ordine entra nella chiave perché tutti i solver ne dipendono (a parità
+    di costo vince il primo indice; SA e tabu estraggono indici casuali):
+    un hit restituisce esattamente l'ordine che il solver darebbe per questo
+    file, non solo "un ordine ottimo". Per i solver esatti si passano solo
+    i parametri che cambiano il risultato (nessuno per exact_dp /
+    exact_optimum: workers e split_depth non contano).
+
+    Per ogni chiave si salvano ordine (id originali), costo, tempo di
+    esecuzione e stats del solver (JSON). Dimensione limitata a max_entries
+    righe, con eviction LRU sull'ultimo accesso. Più processi possono usare
+    lo stesso file (lock di SQLite).
+    """
+    def __init__(self, path=DEFAULT_PATH, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, instance TEXT, solver TEXT, params TEXT,"
+                " order_json TEXT, cost REAL, runtime_s REAL, stats TEXT,"
+                " created REAL, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_lru ON results (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @staticmethod
+    def key(problem, solver, params=None):
+        cp, _ = as_compiled(problem)
+        h = hashlib.sha256()
+        h.update(str(CACHE_VERSION).encode("ascii"))
+        h.update(cp.content_hash().encode("ascii"))
+        h.update(json.dumps([[str(v) for v in cp.ids], cp.edges]).encode("utf-8"))
+        h.update(solver.encode("utf-8"))
+        h.update(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8"))
+        return h.hexdigest()
+
+    def get(self, problem, solver, params=None):
+        """{order, cost, runtime_s, stats} oppure None se assente."""
+        k = self.key(problem, solver, params)
+        db = self._db()
+        row = db.execute(
+            "SELECT order_json, cost, runtime_s, stats FROM results WHERE key = ?", (k,)
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), k))
+        db.commit()
+        order_json, cost, runtime_s, stats = row
+        return {"order": json.loads(order_json), "cost": cost,
+                "runtime_s": runtime_s, "stats": json.loads(stats)}
+
+    def put(self, problem, solver, params, order, cost, runtime_s, stats=None):
+        """Salva (o sostituisce) un risultato e applica l'eviction LRU."""
+        cp, _ = as_compiled(problem)
+        k = self.key(problem, solver, params)
+        now = time.time()
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (k, cp.content_hash(), solver, json.dumps(params or {}, sort_keys=True, default=str),
+             json.dumps(list(order)), float(cost), float(runtime_s),
+             json.dumps(stats or {}, default=str), now, now),
+        )
+        excess = db.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+        if excess > 0:
+            db.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY last_used ASC LIMIT ?)", (excess,)
+            )
+        db.commit()
+
+    def __len__(self):
+        return self._db().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def cached_solve(cache, problem, solver, params, solve):
+    """
+    Risultato di solve() -> (order, cost, stats) passando per la cache.
+    cache None = nessuna cache.
+    Restituisce: order, cost, stats, runtime_s, hit
+      runtime_s = tempo del solver (quello originale se hit=True)
+    """
+    if cache is not None:
+        hit = cache.get(problem, solver, params)
+        if hit is not None:
+            return hit["order"], hit["cost"], hit["stats"], hit["runtime_s"], True
+
+    t0 = time.perf_counter()
+    order, cost, stats = solve()
+    runtime_s = time.perf_counter() - t0
+    if cache is not None:
+        cache.put(problem, solver, params, order, cost, runtime_s, stats)
+    return order, cost, stats, runtime_s, False
@@ -0,0 +1,160 @@
+# sampling.py
+import math
+import random
+
+from problem import as_compiled
+
+
+def as_random(rng=None, seed=None):
+    """
+    random.Random privato per un solver, senza toccare lo stato globale:
+      rng random.Random    -> usato così com'è (il suo stato avanza)
+      rng numpy.Generator  -> nuovo random.Random con seed estratto dal Generator
+      rng None             -> random.Random(seed) (seed None: entropia del sistema)
+    """
+    if rng is None:
+        return random.Random(seed)
+    if isinstance(rng, random.Random):
+        return rng
+    if hasattr(rng, "integers"):  # numpy.random.Generator
+        return random.Random(int(rng.integers(0, 2**63)))
+    raise TypeError("rng must be a random.Random, a numpy.random.Generator or None")
+
+
+def random_kahn_order(problem, rng=None):
+    """
+    Ordinamento topologico casuale con l'algoritmo di Kahn: a ogni passo si
+    estrae un nodo a caso tra quelli disponibili (in-degree 0). O(n + m).
+    Economico ma non uniforme sugli ordinamenti topologici (favorisce le
+    estensioni con più scelte all'inizio).
+
+    rng: random.Random o numpy.Generator (default: nuovo generatore, vedi as_random).
+    """
+    cp, decode = as_compiled(problem)
+    rng = as_random(rng)
+    randrange = rng.randrange
+    indeg = list(cp.indeg)
+    succs = cp.succs
+    available = [u for u in cp.nodes if indeg[u] == 0]
+    order = []
+    while available:
+        # estrazione O(1): il nodo scelto viene scambiato con l'ultimo
+        k = randrange(len(available))
+        available[k], available[-1] = available[-1], available[k]
+        u = available.pop()
+        order.append(u)
+        for v in succs[u]:
+            indeg[v] -= 1
+            if indeg[v] == 0:
+                available.append(v)
+    return decode(order)
+
+
+class UniformSampler:
+    """
+    Campionatore esattamente uniforme degli ordinamenti topologici (estensioni
+    lineari) per DAG piccoli.
+
+    count[S] = numero di completamenti del downset S (bitmask dei nodi già
+    ordinati), con count[V] = 1 e count[S] = sum_{v eseguibile} count[S ∪ {v}]:
+    stessa ricorsione sui downset di exact_dp, con somma al posto del minimo.
+    Un campione sceglie il prossimo nodo v con probabilità
+    count[S ∪ {v}] / count[S], quindi ogni estensione ha probabilità
+    1 / count[∅]. Il conteggio si fa una volta sola (costruttore); ogni
+    campione costa O(n^2).
+
+    max_states: limite ai downset memorizzati (ValueError se superato).
+    """
+    def __init__(self, problem, max_states=2_000_000):
+        self.problem, self._decode = as_compiled(problem)
+        cp = self.problem
+        full = (1 << cp.n) - 1
+        pred_mask = cp.pred_mask
+        nodes = cp.nodes
+        count = {full: 1}
+
+        def c(S):
+            hit = count.get(S)
+            if hit is not None:
+                return hit
+            total = 0
+            for v in nodes:
+                if not (S >> v) & 1 and (pred_mask[v] & S) == pred_mask[v]:
+                    total += c(S | (1 << v))
+            if len(count) >= max_states:
+                raise ValueError(f"Troppi downset (> {max_states}): usa mcmc_topological_order.")
+            count[S] = total
+            return total
+
+        self.n_extensions = c(0)
+        self._count = count
+
+    def sample(self, rng=None):
+        """Un ordinamento topologico uniforme (id originali se il problema non è compilato)."""
+        rng = as_random(rng)
+        cp = self.problem
+        count = self._count
+        pred_mask = cp.pred_mask
+        full = (1 << cp.n) - 1
+        order = []
+        S = 0
+        while S != full:
+            # r uniforme in [0, count[S]): si sceglie il nodo il cui intervallo contiene r
+            r = rng.randrange(count[S])
+            for v in cp.nodes:
+                if (S >> v) & 1 or (pred_mask[v] & S) != pred_mask[v]:
+                    continue
+                k = count[S | (1 << v)]
+                if r < k:
+                    break
+                r -= k
+            order.append(v)
+            S |= 1 << v
+        return self._decode(order)
+
+
+def uniform_topological_order(problem, rng=None, max_states=2_000_000):
+    """Un ordinamento topologico esattamente uniforme (vedi UniformSampler)."""
+    return UniformSampler(problem, max_states=max_states).sample(rng)
+
+
+def mcmc_topological_order(problem, rng=None, steps=None, start=None):
+    """
+    Ordinamento topologico approssimativamente uniforme con la catena di
+    Karzanov-Khachiyan: a ogni passo si sceglie una posizione k a caso e, con
+    probabilità 1/2, si scambiano order[k] e order[k+1] se non c'è un arco
+    tra i due. La catena è simmetrica, quindi la distribuzione stazionaria è
+    uniforme sulle estensioni lineari.
+
+    steps: lunghezza della catena (default n^2 * ceil(log2 n)).
+    start: ordine iniziale (default random_kahn_order).
+    rng: random.Random o numpy.Generator (default: nuovo generatore, vedi as_random).
+    """
+    cp, decode = as_compiled(problem)
+    rng = as_random(rng)
+    n = cp.n
+    if start is None:
+        order = random_kahn_order(cp, rng)
+    else:
+        order = list(start) if cp is problem else cp.encode(start)
+        if not cp.is_topological_order(order):
+            raise ValueError("start non è un ordinamento topologico valido.")
+    if n < 2:
+        return decode(order)
+    if steps is None:
+        steps = n * n * max(1, math.ceil(math.log2(n)))
+
+    succ_mask = cp.succ_mask
+    randrange = rng.randrange
+    for _ in range(steps):
+        # un solo intero casuale: posizione k e bit "lazy" della catena
+        x = randrange(2 * (n - 1))
+        if x & 1:
+            continue
+        k = x >> 1
+        u = order[k]
+        w = order[k + 1]
+        if not (succ_mask[u] >> w) & 1:
+            order[k] = w
+            order[k + 1] = u
+    return decode(order)
@@ -0,0 +1,173 @@
+# sidney.py
+import heapq
+
+from problem import as_compiled
+from heuristics import GREEDY_SCORES
+
+
+def _rank(job):
+    """Rapporto c/(1-p) di un job composito (C, P, ordine)."""
+    C, P, _ = job
+    q = 1.0 - P
+    return C / q if q > 0 else float("inf")
+
+
+def _combine(a, b):
+    """Job composito 'a poi b': C = C_a + P_a * C_b, P = P_a * P_b."""
+    return (a[0] + a[1] * b[0], a[1] * b[1], a[2] + b[2])
+
+
+def _closure_masks(cp):
+    """Bitmask di antenati e discendenti (chiusura transitiva) per ogni nodo."""
+    anc = [0] * cp.n
+    desc = [0] * cp.n
+    for v in cp.topo:
+        for u in cp.preds[v]:
+            anc[v] |= anc[u] | (1 << u)
+    for u in reversed(cp.topo):
+        for v in cp.succs[u]:
+            desc[u] |= desc[v] | (1 << v)
+    return anc, desc
+
+
+def _bits(mask):
+    """Indici dei bit accesi di 'mask', in ordine crescente."""
+    out = []
+    while mask:
+        low = mask & -mask
+        out.append(low.bit_length() - 1)
+        mask ^= low
+    return out
+
+
+def _components(M, neigh):
+    """Componenti connesse di M, con neigh(v) = bitmask dei vicini di v."""
+    comps = []
+    rest = M
+    while rest:
+        low = rest & -rest
+        comp = low
+        frontier = low
+        while frontier:
+            f = frontier & -frontier
+            frontier ^= f
+            new = neigh(f.bit_length() - 1) & M & ~comp
+            comp |= new
+            frontier |= new
+        comps.append(comp)
+        rest &= ~comp
+    return comps
+
+
+def decomposition_tree(problem):
+    """
+    Albero di decomposizione serie-parallelo dell'ordine parziale del DAG
+    (chiusura transitiva), con nodi:
+      ("leaf", v) | ("P", [figli]) | ("S", [figli in ordine]) | ("prime", mask)
+
+    - P: componenti connesse del grafo di comparabilità (nessun vincolo tra loro)
+    - S: componenti del grafo di incomparabilità, totalmente ordinate
+    - prime: né l'una né l'altra (il DAG non è serie-parallelo in quel modulo)
+    Costo O(n^2) operazioni su bitmask per livello.
+    """
+    cp, _ = as_compiled(problem)
+    anc, desc = _closure_masks(cp)
+    comparable = [anc[v] | desc[v] for v in range(cp.n)]
+
+    def build(M):
+        if M & (M - 1) == 0:
+            return ("leaf", M.bit_length() - 1)
+
+        comps = _components(M, lambda v: comparable[v])
+        if len(comps) > 1:
+            return ("P", [build(c) for c in comps])
+
+        comps = _components(M, lambda v: ~(comparable[v] | (1 << v)))
+        if len(comps) > 1:
+            # in una composizione serie chi viene prima ha meno antenati in M
+            comps.sort(key=lambda c: bin(anc[(c & -c).bit_length() - 1] & M).count("1"))
+            return ("S", [build(c) for c in comps])
+
+        return ("prime", M)
+
+    return build((1 << cp.n) - 1)
+
+
+def sidney_solution(problem, fallback="c_over_fail"):
+    """
+    Sequenziamento per decomposizione di Sidney su ordini serie-paralleli.
+
+    Ogni sotto-albero produce una lista di job compositi (C, P, ordine) a
+    rapporto C/(1-P) non decrescente:
+      - foglia v      -> [(c_v, p_v, [v])]
+      - parallelo     -> merge delle liste dei figli per rapporto
+      - serie A;B     -> concatenazione, fondendo il job finale con il
+                         successivo finché i rapporti non tornano crescenti
+    Su DAG serie-paralleli l'ordine risultante è ottimo, in O(n log n) dopo
+    la decomposizione. I moduli "prime" (non serie-paralleli) vengono
+    linearizzati con la greedy 'fallback' (nome in GREEDY_SCORES o funzione
+    score(cost, p), come il mode di greedy_solution) ristretta al modulo:
+    l'ordine resta ammissibile ma non è più garantito ottimo.
+
+    Restituisce: order, cost, info
+      info["series_parallel"] = True se nessun modulo prime (soluzione esatta)
+      info["prime_modules"]   = numero di moduli linearizzati con la greedy
+    """
+    cp, decode = as_compiled(problem)
+    if callable(fallback):
+        rule = fallback
+    elif fallback in GREEDY_SCORES:
+        rule = GREEDY_SCORES[fallback]
+    else:
+        raise ValueError("fallback must be 'c_over_p', 'c_over_fail' or a callable score(cost, p)")
+    tree = decomposition_tree(cp)
+    primes = [0]
+
+    def series(lists):
+        out = []
+        for jobs in lists:
+            for job in jobs:
+                out.append(job)
+                while len(out) >= 2 and _rank(out[-2]) >= _rank(out[-1]):
+                    b = out.pop()
+                    out[-1] = _combine(out[-1], b)
+        return out
+
+    def greedy_chain(M):
+        # greedy per rapporto sul sottografo indotto da M
+        def score(v):
+            return rule(cp.cost[v], cp.p[v])
+
+        members = _bits(M)
+        indeg = {v: bin(cp.pred_mask[v] & M).count("1") for v in members}
+        heap = [(score(v), v) for v in members if indeg[v] == 0]
+        heapq.heapify(heap)
+        chain = []
+        while heap:
+            _, u = heapq.heappop(heap)
+            chain.append([(cp.cost[u], cp.p[u], [u])])
+            for v in cp.succs[u]:
+                if (M >> v) & 1:
+                    indeg[v] -= 1
+                    if indeg[v] == 0:
+                        heapq.heappush(heap, (score(v), v))
+        return chain
+
+    def solve(node):
+        kind, payload = node
+        if kind == "leaf":
+            v = payload
+            return [(cp.cost[v], cp.p[v], [v])]
+        if kind == "P":
+            return list(heapq.merge(*[solve(ch) for ch in payload], key=_rank))
+        if kind == "S":
+            return series([solve(ch) for ch in payload])
+        primes[0] += 1
+        return series(greedy_chain(payload))
+
+    order = []
+    for _, _, part in solve(tree):
+        order.extend(part)
+
+    info = {"series_parallel": primes[0] == 0, "prime_modules": primes[0]}
+    return decode(order), cp.expected_cost(order), info
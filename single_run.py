@@ -17,7 +17,7 @@ def main():
     problem = load_graph_from_json(args.graph)
 
     print("File:", args.graph)
-    print("Nodes:", len(problem.nodes), "Edges:", problem.G.number_of_edges())
+    print("Nodes:", len(problem.nodes), "Edges:", len(problem.compiled.edges))
 
     # greedy
     g_order, g_cost = greedy_solution(problem)
@@ -30,9 +30,9 @@ def main():
     print("SA order =", " -> ".join(map(str, sa_order)))
 
     # plot semplice andamento SA
-    steps = [h["step"] for h in history]
-    current = [h["current_cost"] for h in history]
-    best = [h["best_cost"] for h in history]
+    steps = history.step
+    current = history.current_cost
+    best = history.best_cost
 
     plt.plot(steps, current, label="current")
     plt.plot(steps, best, label="best")
@@ -6,7 +6,8 @@ import matplotlib.pyplot as plt
 # per salvare plot: python single_run.py testN10/grafo_01.json --algo sa --save_sa sa_plot.png  
 
 from io_json import load_problem_from_json_bytes
-from heuristics import greedy_solution, simulated_annealing
+from heuristics import greedy_solution, simulated_annealing, tabu_search
+from result_cache import ResultCache, cached_solve, DEFAULT_PATH as CACHE_PATH
 
 
 def load_problem(path):
@@ -15,9 +16,9 @@ def load_problem(path):
 
 
 def plot_sa_history(history, save=None):
-    steps = [h["step"] for h in history]
-    current = [h["current_cost"] for h in history]
-    best = [h["best_cost"] for h in history]
+    steps = history.step
+    current = history.current_cost
+    best = history.best_cost
 
     plt.figure()
     plt.plot(steps, current, label="current")
@@ -43,7 +44,7 @@ def main():
         "--algo",
         nargs="+",
         default=["greedy_cp", "greedy_cfail", "sa"],
-        choices=["greedy_cp", "greedy_cfail", "sa"],
+        choices=["greedy_cp", "greedy_cfail", "sa", "tabu"],
         help="Algoritmi da eseguire (default: greedy_cp sa)"
     )
 
@@ -54,6 +55,21 @@ def main():
     p.add_argument("--iters_per_T", type=int, default=500)
     p.add_argument("--max_steps", type=int, default=50000)
     p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--move", choices=["swap", "insert", "mixed"], default="swap",
+                   help="Mossa della SA")
+
+    # tabu search params
+    p.add_argument("--ts_iters", type=int, default=500)
+    p.add_argument("--ts_tenure", type=int, default=None, help="Default: max(3, n // 4)")
+
+    # cache dei risultati (SQLite): SA e tabu sono deterministiche dato il seed
+    # coppia store_true/store_false: BooleanOptionalAction richiede Python >= 3.9
+    p.add_argument("--cache", dest="cache", action="store_true",
+                   help="Riusa i risultati già calcolati con gli stessi parametri")
+    p.add_argument("--no-cache", dest="cache", action="store_false",
+                   help="Esegue sempre gli algoritmi (default)")
+    p.set_defaults(cache=False)
+    p.add_argument("--cache_path", default=CACHE_PATH, help="File SQLite della cache")
 
     # plot SA (opzionale)
     p.add_argument("--plot_sa", action="store_true", help="Mostra il plot dell'andamento SA")
@@ -62,9 +78,10 @@ def main():
     args = p.parse_args()
 
     problem = load_problem(args.graph)
+    results = ResultCache(args.cache_path) if args.cache else None
 
     print("File:", args.graph)
-    print("Nodes:", len(problem.nodes), "Edges:", problem.G.number_of_edges())
+    print("Nodes:", len(problem.nodes), "Edges:", len(problem.compiled.edges))
 
     # ------------------------------------------------------------------
     # Plot grafo (PER ORA COMMENTATO)
@@ -100,29 +117,61 @@ def main():
     # SIMULATED ANNEALING
     # ------------------------------------------------------------------
     if "sa" in args.algo:
-        t0 = time.perf_counter()
-        sa_order, sa_cost, history = simulated_annealing(
-            problem,
-            T_start=args.T_start,
-            T_end=args.T_end,
-            alpha=args.alpha,
-            iters_per_T=args.iters_per_T,
-            max_steps=args.max_steps,
-            seed=args.seed,
-            record_every_step=True,   # per plot (se vuoi history compatta metti False)
-        )
-        dt = time.perf_counter() - t0
+        sa_params = {"T_start": args.T_start, "T_end": args.T_end, "alpha": args.alpha,
+                     "iters_per_T": args.iters_per_T, "max_steps": args.max_steps,
+                     "seed": args.seed, "move": args.move}
+        history = None
+
+        def run_sa():
+            nonlocal history
+            order, cost, history = simulated_annealing(
+                problem,
+                record_every_step=True,   # per plot (se vuoi history compatta metti False)
+                **sa_params,
+            )
+            return order, cost, {"move_stats": history.move_stats}
+
+        # il plot richiede la history: in quel caso la SA si riesegue sempre
+        plot = args.plot_sa or args.save_sa
+        sa_order, sa_cost, sa_stats, dt, hit = cached_solve(
+            None if plot else results, problem, "simulated_annealing", sa_params, run_sa)
 
         print("\n[Simulated Annealing]")
         print("params: ",
               f"T_start={args.T_start}, T_end={args.T_end}, alpha={args.alpha}, "
-              f"iters_per_T={args.iters_per_T}, max_steps={args.max_steps}, seed={args.seed}")
-        print("cost =", sa_cost, "| time =", f"{dt:.4f}s")
+              f"iters_per_T={args.iters_per_T}, max_steps={args.max_steps}, seed={args.seed}, "
+              f"move={args.move}")
+        print("cost =", sa_cost, "| time =", f"{dt:.4f}s", "(cache)" if hit else "")
+        for kind, ms in sa_stats["move_stats"].items():
+            print(f"{kind}: proposte={ms['proposed']}  non ammissibili={ms['infeasible']}  "
+                  f"rifiutate={ms['rejected_rate']:.1%}")
         print("order =", " -> ".join(map(str, sa_order)))
 
-        if args.plot_sa or args.save_sa:
+        if plot:
             plot_sa_history(history, save=args.save_sa)
 
+    # ------------------------------------------------------------------
+    # TABU SEARCH
+    # ------------------------------------------------------------------
+    if "tabu" in args.algo:
+        ts_params = {"max_iters": args.ts_iters, "tenure": args.ts_tenure, "seed": args.seed}
+
+        def run_ts():
+            order, cost, h = tabu_search(problem, **ts_params)
+            return order, cost, {"stop_reason": h.stop_reason}
+
+        ts_order, ts_cost, ts_stats, dt, hit = cached_solve(
+            results, problem, "tabu_search", ts_params, run_ts)
+
+        print("\n[Tabu search]")
+        print("params: ", f"max_iters={args.ts_iters}, tenure={args.ts_tenure}, seed={args.seed}")
+        print("cost =", ts_cost, "| time =", f"{dt:.4f}s", "| stop =", ts_stats["stop_reason"],
+              "(cache)" if hit else "")
+        print("order =", " -> ".join(map(str, ts_order)))
+
+    if results is not None:
+        results.close()
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,11 +1,10 @@
 import os
-import math
 import csv
 import argparse
-import random
 from statistics import median
 
 from load_graph import load_graph_from_json
+from calibration import calibrate, quantile
 """
 python stima_parametro.py --folder testN10 --out stima_N10.xlsx
 python stima_parametro.py --folder testN15 --out stima_N15.xlsx
@@ -13,60 +12,6 @@ python stima_parametro.py --folder testN20 --out stima_N20.xlsx
 """
 
 
-def quantile(sorted_vals, q):
-    """q in [0,1]. sorted_vals must be sorted."""
-    if not sorted_vals:
-        return None
-    if q <= 0:
-        return sorted_vals[0]
-    if q >= 1:
-        return sorted_vals[-1]
-    pos = q * (len(sorted_vals) - 1)
-    lo = int(math.floor(pos))
-    hi = int(math.ceil(pos))
-    if lo == hi:
-        return sorted_vals[lo]
-    frac = pos - lo
-    return sorted_vals[lo] * (1 - frac) + sorted_vals[hi] * frac
-
-
-def estimate_T_start(problem, samples=1000, p0=0.8, repeats=3, seed=42):
-    """
-    Stima T_start dal grafo.
-    - samples: tentativi swap per ogni repeat
-    - repeats: quante soluzioni iniziali random (migliora robustezza)
-    - p0: prob. target di accettare un peggioramento "tipico" all'inizio (0.7-0.9)
-    """
-    rng = random.Random(seed)
-    n = len(problem.nodes)
-
-    deltas_pos = []
-
-    for r in range(repeats):
-        # ordine topologico casuale
-        order = problem.random_topological_order()
-        base_cost = problem.expected_cost(order)
-
-        for _ in range(samples):
-            i, j = rng.sample(range(n), 2)
-            neigh = problem.try_swap(order, i, j)
-            if neigh is None:
-                continue
-            d = problem.expected_cost(neigh) - base_cost
-            if d > 0:
-                deltas_pos.append(d)
-
-    if not deltas_pos:
-        return None, None  # non stimabile (troppi swap invalidi o delta mai > 0)
-
-    deltas_pos.sort()
-    d_typ = quantile(deltas_pos, 0.50)  # mediana dei delta positivi
-
-    # T_start = - d / ln(p0)
-    T_start = - d_typ / math.log(p0)
-    return float(T_start), float(d_typ)
-
-
 def list_json_files(folder):
     files = []
     for name in os.listdir(folder):
@@ -101,6 +46,8 @@ def main():
     ap.add_argument("--repeats", type=int, default=3)
     ap.add_argument("--p0", type=float, default=0.8)
     ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--q", type=float, default=0.5, help="Quantile dei delta positivi (0.5 = mediana)")
+    ap.add_argument("--cache", default=None, help="Cartella cache della calibrazione (opzionale)")
 
     ap.add_argument("--T_end_frac", type=float, default=0.01, help="T_end = T_start * frac (default 0.01)")
     ap.add_argument("--out", default="stima_T.csv", help="Output .csv o .xlsx")
@@ -120,26 +67,28 @@ def main():
     for path in paths:
         problem = load_graph_from_json(path)
 
-        T_start, d_typ = estimate_T_start(
+        T_start, d_typ, T_end, iters_per_T = calibrate(
             problem,
             samples=args.samples,
-            p0=args.p0,
             repeats=args.repeats,
-            seed=args.seed
+            p0=args.p0,
+            q=args.q,
+            T_end_frac=args.T_end_frac,
+            seed=args.seed,
+            cache_dir=args.cache,
         )
 
         n = len(problem.nodes)
-        m = problem.G.number_of_edges()
+        m = len(problem.compiled.edges)
 
         if T_start is None:
             # fallback sensato (se non stimabile)
             T_start = 300.0
             d_typ = None
-
-        T_end = T_start * args.T_end_frac
+            T_end = T_start * args.T_end_frac
+            iters_per_T = 50 * n
 
         # suggerimenti "tipici" per gli altri parametri (puoi cambiarli)
-        iters_per_T = 50 * n
         max_steps = 5000 * n
 
         rows.append({
@@ -148,6 +97,7 @@ def main():
             "n": n,
             "m": m,
             "p0": args.p0,
+            "q": args.q,
             "samples": args.samples,
             "repeats": args.repeats,
             "d_typ": d_typ,
@@ -0,0 +1,159 @@
+# tempering.py
+import math
+import time
+import random
+
+from problem import as_compiled
+from evaluator import OrderEvaluator
+from sampling import as_random
+
+
+def temperature_ladder(T_min, T_max, n_replicas):
+    """Scala geometrica di n_replicas temperature da T_min a T_max."""
+    if n_replicas == 1:
+        return [float(T_min)]
+    ratio = (T_max / T_min) ** (1.0 / (n_replicas - 1))
+    return [T_min * ratio ** k for k in range(n_replicas)]
+
+
+def _metropolis(cp, order, T, steps, rng):
+    """
+    steps passi di Metropolis a temperatura fissa T (mossa = swap) partendo da
+    'order'. Restituisce (ordine, costo, best_ordine, best_costo, proposte,
+    accettate) del segmento.
+    """
+    ev = OrderEvaluator(cp, order)
+    current = ev.order
+    best, best_cost = list(current), ev.cost
+    positions = range(cp.n)
+    accepted = 0
+
+    for _ in range(steps):
+        i, j = rng.sample(positions, 2)
+        if not cp.can_swap(current, i, j):
+            continue
+        delta = ev.delta_swap(i, j)
+        if delta < 0 or rng.random() < math.exp(-delta / T):
+            ev.commit_swap(i, j, delta)
+            accepted += 1
+            if ev.cost < best_cost:
+                best, best_cost = list(current), ev.cost
+
+    ev.resync()
+    return current, ev.cost, best, best_cost, steps, accepted
+
+
+# problema compilato dei worker del pool (impostato da _init_worker)
+_worker_cp = None
+
+
+def _init_worker(cp):
+    global _worker_cp
+    _worker_cp = cp
+
+
+def _segment(task):
+    """Task del pool: un segmento di Metropolis di una replica."""
+    k, order, T, steps, rng_state = task
+    rng = random.Random()
+    rng.setstate(rng_state)
+    out = _metropolis(_worker_cp, order, T, steps, rng)
+    return (k,) + out + (rng.getstate(),)
+
+
+def parallel_tempering(problem, n_replicas=4, T_min=1.0, T_max=50.0,
+                       exchange_every=200, n_exchanges=100, workers=None,
+                       seed=42, time_budget_s=None, rng=None):
+    """
+    Parallel tempering (replica exchange) con mossa = swap.
+
+    - n_replicas catene a temperature geometriche tra T_min e T_max
+    - ogni round: exchange_every passi di Metropolis per replica (nei processi
+      del pool se workers > 1), poi tentativi di scambio degli stati tra
+      temperature adiacenti (coppie pari/dispari alternate) con probabilità
+      min(1, exp((1/T_i - 1/T_j) * (E_i - E_j)))
+    - si ferma dopo n_exchanges round o quando scade time_budget_s
+
+    Ogni replica ha il suo random.Random (seed + k) il cui stato viaggia con
+    il task: il risultato non dipende dal numero di worker.
+    rng: random.Random o numpy.Generator da cui derivare i generatori delle
+    repliche al posto di seed.
+
+    Restituisce: best_order, best_cost, stats
+      stats["replicas"]  : per temperatura T, proposals, accepted, swaps_tried,
+                           swaps_accepted, best_cost, final_cost
+      stats["rounds"], stats["time_s"]
+    """
+    cp, decode = as_compiled(problem)
+    t0 = time.perf_counter()
+    if cp.n < 2:
+        # nessuna mossa possibile: l'unico ordine è quello banale
+        cost = cp.expected_cost(cp.topo)
+        info = {"replicas": [], "rounds": 0, "time_s": time.perf_counter() - t0}
+        return decode(list(cp.topo)), cost, info
+    temps = temperature_ladder(T_min, T_max, n_replicas)
+    if rng is None:
+        master = random.Random(seed)
+        rngs = [random.Random(seed + 1 + k) for k in range(n_replicas)]
+    else:
+        master = as_random(rng)
+        rngs = [random.Random(master.getrandbits(64)) for _ in range(n_replicas)]
+    # state[t] = (ordine, costo) della replica alla temperatura temps[t]
+    state = []
+    for k in range(n_replicas):
+        order = cp.random_topological_order(rng=rngs[k])
+        state.append((order, cp.expected_cost(order)))
+    rng_states = [r.getstate() for r in rngs]
+
+    stats = [{"T": T, "proposals": 0, "accepted": 0, "swaps_tried": 0,
+              "swaps_accepted": 0, "best_cost": c, "final_cost": c}
+             for T, (_, c) in zip(temps, state)]
+    g_best, g_best_cost = min(state, key=lambda s: s[1])
+    g_best = list(g_best)
+
+    pool = None
+    if workers and workers > 1:
+        import multiprocessing as mp
+        pool = mp.Pool(workers, initializer=_init_worker, initargs=(cp,))
+    else:
+        _init_worker(cp)
+
+    rounds = 0
+    try:
+        while rounds < n_exchanges:
+            if time_budget_s is not None and time.perf_counter() - t0 >= time_budget_s:
+                break
+            tasks = [(t, state[t][0], temps[t], exchange_every, rng_states[t])
+                     for t in range(n_replicas)]
+            outs = pool.map(_segment, tasks) if pool else [_segment(x) for x in tasks]
+
+            for t, order, cost, best, best_cost, props, acc, rng_state in outs:
+                state[t] = (order, cost)
+                rng_states[t] = rng_state
+                st = stats[t]
+                st["proposals"] += props
+                st["accepted"] += acc
+                st["best_cost"] = min(st["best_cost"], best_cost)
+                if best_cost < g_best_cost:
+                    g_best, g_best_cost = best, best_cost
+
+            # scambi tra temperature adiacenti (pari/dispari alternati)
+            for t in range(rounds % 2, n_replicas - 1, 2):
+                (oi, ei), (oj, ej) = state[t], state[t + 1]
+                stats[t]["swaps_tried"] += 1
+                x = (1.0 / temps[t] - 1.0 / temps[t + 1]) * (ei - ej)
+                if x >= 0 or master.random() < math.exp(x):
+                    state[t], state[t + 1] = state[t + 1], state[t]
+                    stats[t]["swaps_accepted"] += 1
+            rounds += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    for t in range(n_replicas):
+        stats[t]["final_cost"] = state[t][1]
+
+    g_best_cost = cp.expected_cost(g_best)
+    info = {"replicas": stats, "rounds": rounds, "time_s": time.perf_counter() - t0}
+    return decode(g_best), g_best_cost, info
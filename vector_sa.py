@@ -0,0 +1,137 @@
+# vector_sa.py
+import time
+import random
+import numpy as np
+
+from problem import as_compiled
+from sampling import as_random
+
+
+def precedence_matrix(problem):
+    """Matrice booleana n x n degli archi diretti: A[u, v] = True se u->v."""
+    cp, _ = as_compiled(problem)
+    A = np.zeros((cp.n, cp.n), dtype=bool)
+    for u, v in cp.edges:
+        A[u, v] = True
+    return A
+
+
+def batch_expected_cost(orders, c, p):
+    """Costo atteso di ogni riga di 'orders' (M, n): sum_k c_k * prod_{j<k} p_j."""
+    P = p[orders]
+    reach = np.ones_like(P)
+    np.cumprod(P[:, :-1], axis=1, out=reach[:, 1:])
+    return (c[orders] * reach).sum(axis=1)
+
+
+def batch_simulated_annealing(problem, n_chains=64, T_start=1.0, T_end=1e-3,
+                              alpha=0.98, iters_per_T=200, max_steps=15000, seed=42,
+                              rng=None):
+    """
+    Simulated Annealing vettorizzato: M = n_chains catene in lockstep, tenute
+    come array (M, n) di ordini (più l'inversa pos[m, v] = posizione di v).
+
+    Ogni step propone M swap in una volta:
+      - ammissibilità dalla matrice di precedenza A: lo swap lo<hi è invalido
+        se u=order[lo] ha un successore in posizione <= hi, oppure
+        w=order[hi] ha un predecessore in posizione >= lo
+      - costi di tutti i vicini con operazioni su array (cumprod sulle righe)
+      - un solo test di Metropolis vettorizzato
+    Il raffreddamento usa gli stessi parametri di simulated_annealing
+    (T_start, T_end, alpha, iters_per_T, max_steps).
+    rng: numpy.Generator o random.Random (come negli altri solver, vedi
+    as_random); default default_rng(seed). Un random.Random viene convertito
+    una volta sola in un Generator con seed estratto da esso; se dato, anche
+    gli ordini iniziali delle catene ne derivano.
+
+    Restituisce: best_order, best_cost, stats con chains, steps, proposals,
+    accepted, infeasible, time_s, proposals_per_s, chain_best_costs.
+    """
+    cp, decode = as_compiled(problem)
+    t0 = time.perf_counter()
+    n, M = cp.n, n_chains
+    if rng is None:
+        rng = np.random.default_rng(seed)
+        starts = [random.Random(seed + m) for m in range(n_chains)]
+    else:
+        if not hasattr(rng, "integers"):  # random.Random -> numpy.Generator
+            rng = np.random.default_rng(as_random(rng, seed).getrandbits(64))
+        starts = [as_random(rng) for _ in range(n_chains)]
+
+    c = np.asarray(cp.cost, dtype=float)
+    p = np.asarray(cp.p, dtype=float)
+    A = precedence_matrix(cp)
+    rows = np.arange(M)
+
+    orders = np.array([cp.random_topological_order(rng=starts[m])
+                       for m in range(M)], dtype=np.intp).reshape(M, n)
+    pos = np.empty_like(orders)
+    pos[rows[:, None], orders] = np.arange(n)
+    cost = batch_expected_cost(orders, c, p)
+
+    best_orders = orders.copy()
+    best_costs = cost.copy()
+    accepted_tot = 0
+    infeasible_tot = 0
+
+    T = T_start
+    step = 0
+    while n > 1 and T > T_end and step < max_steps:
+        for _ in range(iters_per_T):
+            step += 1
+
+            i = rng.integers(0, n, M)
+            j = rng.integers(0, n - 1, M)
+            j += j >= i
+            lo = np.minimum(i, j)
+            hi = np.maximum(i, j)
+            u = orders[rows, lo]
+            w = orders[rows, hi]
+
+            bad = (A[u] & (pos <= hi[:, None])).any(axis=1)
+            bad |= (A[:, w].T & (pos >= lo[:, None])).any(axis=1)
+            feasible = ~bad
+            infeasible_tot += int(bad.sum())
+
+            new = orders.copy()
+            new[rows, lo] = w
+            new[rows, hi] = u
+            delta = batch_expected_cost(new, c, p) - cost
+
+            accept = feasible & ((delta < 0) |
+                                 (rng.random(M) < np.exp(-np.maximum(delta, 0.0) / T)))
+            if accept.any():
+                a = rows[accept]
+                orders[a] = new[a]
+                pos[a, w[a]] = lo[a]
+                pos[a, u[a]] = hi[a]
+                cost[a] += delta[a]
+                accepted_tot += len(a)
+
+                improved = cost < best_costs
+                best_orders[improved] = orders[improved]
+                best_costs[improved] = cost[improved]
+
+            if step >= max_steps:
+                break
+
+        # riallineo i costi (deriva dei delta) una volta per temperatura
+        cost = batch_expected_cost(orders, c, p)
+        T *= alpha
+
+    best_costs = batch_expected_cost(best_orders, c, p)
+    k = int(np.argmin(best_costs))
+    best = [int(v) for v in best_orders[k]]
+
+    elapsed = time.perf_counter() - t0
+    stats = {
+        "chains": M,
+        "steps": step,
+        "proposals": step * M,
+        "accepted": accepted_tot,
+        "infeasible": infeasible_tot,
+        "time_s": elapsed,
+        "proposals_per_s": step * M / elapsed if elapsed > 0 else None,
+        "chain_best_costs": best_costs.tolist(),
+    }
+    return decode(best), cp.expected_cost(best), stats